@@ -9,62 +9,225 @@
 - Настройка логирования в консоль и файл
 - Запуск бота в режиме polling
 - Обработка событий запуска и остановки
+- Перечитывание промптов и сообщений по сигналу SIGHUP
+- Проверка конфигурации без запуска бота: python app.py --check-config
 """
 import asyncio
 import logging
+import os
+import queue
+import signal
+import sys
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
 import misc
 from hendlers import all_handlers
 from config import Config
+from utils.telegram_limiter import OutgoingRateLimitMiddleware
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Таймаут long polling для getUpdates (секунды)
+POLLING_TIMEOUT = 30
+# Максимальное количество одновременно обрабатываемых апдейтов
+TASKS_CONCURRENCY_LIMIT = 32
+# Максимальное количество соединений с сервером Bot API
+BOT_API_CONNECTIONS_LIMIT = 100
+# Максимальное количество исходящих сообщений в секунду (лимит Telegram)
+OUTGOING_MESSAGES_PER_SECOND = 30
+# Максимальное количество исходящих сообщений в секунду в одном чате (лимит Telegram)
+OUTGOING_MESSAGES_PER_CHAT_PER_SECOND = 1
+# Максимальное количество исходящих сообщений в минуту в одной группе (лимит Telegram)
+OUTGOING_MESSAGES_PER_GROUP_PER_MINUTE = 20
+
+# Параметры буферизации файлового лога
+LOG_BUFFER_CAPACITY = 512  # Количество записей в буфере до сброса в файл
+LOG_FLUSH_INTERVAL = 2  # Интервал принудительного сброса буфера (секунды)
+
 def setup_logging():
     """
     Настраивает логирование в консоль и файл bot_log.log.
 
+    Записи из обработчиков попадают в очередь через QueueHandler, а запись
+    в консоль и файл выполняет QueueListener в отдельном потоке, чтобы
+    файловый ввод-вывод не блокировал цикл событий asyncio.
+    Слушатель останавливается в misc.on_shutdown.
+
+    Файловый обработчик обернут в MemoryHandler: записи копятся в памяти и
+    сбрасываются на диск при заполнении буфера, при записи уровня WARNING и выше,
+    а также периодически (см. flush_log_buffer_periodically). При аварийном
+    завершении процесса последние записи уровня INFO/DEBUG могут быть потеряны.
+
+    Вывод в консоль (stderr) включается только при запуске в терминале, чтобы в
+    контейнерах записи не дублировались в файл и поток вывода. Служебные логгеры
+    aiogram.event и aiohttp ограничены уровнем WARNING.
+
     Формат: %(asctime)s - %(name)s - %(levelname)s - %(message)s
     Уровень: INFO
     """
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO,
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('bot_log.log', encoding='utf-8')
-        ]
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = []
+
+    if os.isatty(sys.stderr.fileno()):
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+
+    file_handler = logging.FileHandler('bot_log.log', encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    buffered_file_handler = MemoryHandler(
+        capacity=LOG_BUFFER_CAPACITY,
+        flushLevel=logging.WARNING,
+        target=file_handler,
+        flushOnClose=True
     )
+    handlers.append(buffered_file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    # Слушатель хранится на обработчике, чтобы его можно было остановить при выключении
+    queue_handler.listener = listener
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(queue_handler)
+    logging.getLogger('aiogram.event').setLevel(logging.WARNING)
+    logging.getLogger('aiohttp').setLevel(logging.WARNING)
+    listener.start()
     logger.info("Логирование настроено: консоль и файл bot_log.log")
 
+async def flush_log_buffer_periodically():
+    """
+    Периодически сбрасывает буфер файлового лога на диск.
+
+    Запись выполняется в пуле потоков, чтобы не блокировать цикл событий.
+    Работает до отмены задачи.
+    """
+    while True:
+        await asyncio.sleep(LOG_FLUSH_INTERVAL)
+        await asyncio.to_thread(misc.flush_log_buffers)
+
+def create_storage() -> BaseStorage:
+    """
+    Создает хранилище состояний FSM.
+
+    Если задан REDIS_URL, состояния хранятся в Redis с временем жизни FSM_TTL:
+    память процесса не растет с числом пользователей, а несколько экземпляров
+    бота могут работать с общими состояниями. Соединения берутся из общего пула
+    размером REDIS_MAX_CONNECTIONS: при нехватке запросы ждут свободное соединение,
+    а не открывают новые. Иначе используется MemoryStorage.
+
+    Raises:
+        RuntimeError: Если задан REDIS_URL, но пакет redis не установлен
+    """
+    if not Config.REDIS_URL:
+        logger.info("Хранилище FSM: память процесса")
+        return MemoryStorage()
+
+    try:
+        from aiogram.fsm.storage.redis import RedisStorage
+        from redis.asyncio import BlockingConnectionPool, Redis
+    except ImportError as e:
+        raise RuntimeError("Для REDIS_URL необходим пакет redis: pip install redis") from e
+
+    logger.info("Хранилище FSM: Redis")
+    pool = BlockingConnectionPool.from_url(Config.REDIS_URL, max_connections=Config.REDIS_MAX_CONNECTIONS)
+    return RedisStorage(
+        Redis(connection_pool=pool),
+        state_ttl=Config.FSM_TTL,
+        data_ttl=Config.FSM_TTL
+    )
+
+def create_events_isolation(storage: BaseStorage) -> BaseEventIsolation:
+    """
+    Создает изоляцию событий для диспетчера.
+
+    Апдейты одного чата обрабатываются строго по очереди, а апдейты разных чатов
+    параллельно: долгий запрос к ChatGPT в одном чате не задерживает другие
+    и не приводит к гонкам состояний FSM внутри чата.
+    Для Redis используется распределенная блокировка, иначе блокировка в памяти.
+    """
+    create_isolation = getattr(storage, "create_isolation", None)
+    if create_isolation is not None:
+        return create_isolation()
+    return SimpleEventIsolation()
+
+def _reload_config() -> None:
+    """Перечитывает промпты и сообщения (обработчик SIGHUP)."""
+    try:
+        Config.reload()
+        logger.info("Промпты и сообщения перечитаны")
+    except Exception as e:
+        logger.error("Ошибка перечитывания ресурсов: %s", e)
+
+def register_reload_signal() -> None:
+    """
+    Регистрирует перечитывание ресурсов по SIGHUP: kill -HUP <pid>.
+
+    На платформах без SIGHUP или без поддержки сигналов в цикле событий (Windows)
+    ничего не делает.
+    """
+    if not hasattr(signal, "SIGHUP"):
+        return
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _reload_config)
+    except NotImplementedError:
+        return
+    logger.info("Перечитывание ресурсов по SIGHUP включено")
+
 async def main():
     """
     Основная асинхронная функция для запуска бота.
 
     Действия:
-    1. Проверяет конфигурацию
+    1. Проверяет конфигурацию (Config.validate)
     2. Инициализирует бота и диспетчер
     3. Регистрирует роутеры и обработчики startup/shutdown
     4. Удаляет вебхук и запускает polling
 
     Raises:
-        ValueError: Если TELEGRAM_TOKEN не задан
+        ValueError: Если TELEGRAM_TOKEN или OPENAI_API_KEY не заданы
+        FileNotFoundError: Если отсутствует файл изображения
         Exception: При ошибках инициализации или polling
     """
     logger.info("Запуск бота")
 
     # Проверка конфигурации
-    if not Config.TELEGRAM_TOKEN:
-        logger.error("TELEGRAM_TOKEN не задан в конфигурации")
-        raise ValueError("TELEGRAM_TOKEN не задан")
+    try:
+        Config.validate()
+    except (ValueError, FileNotFoundError) as e:
+        logger.error("Ошибка конфигурации: %s", e)
+        raise
+
+    register_reload_signal()
+
+    # Запуск периодического сброса буфера логов
+    flush_task = asyncio.create_task(flush_log_buffer_periodically())
 
     try:
-        # Инициализация бота
-        bot = Bot(token=Config.TELEGRAM_TOKEN)
-        logger.info("Бот инициализирован")
+        # Инициализация бота с общей HTTP-сессией: соединения с Bot API
+        # переиспользуются между запросами. Сессию закрывает start_polling.
+        session = AiohttpSession(
+            api=TelegramAPIServer.from_base(Config.BOT_API_URL),
+            limit=BOT_API_CONNECTIONS_LIMIT
+        )
+        session.middleware(OutgoingRateLimitMiddleware(
+            rate=OUTGOING_MESSAGES_PER_SECOND,
+            chat_rate=OUTGOING_MESSAGES_PER_CHAT_PER_SECOND,
+            group_rate=OUTGOING_MESSAGES_PER_GROUP_PER_MINUTE / 60
+        ))
+        bot = Bot(token=Config.TELEGRAM_TOKEN, session=session)
+        logger.info("Бот инициализирован, Bot API: %s", Config.BOT_API_URL)
 
         # Инициализация диспетчера
-        dp = Dispatcher()
+        storage = create_storage()
+        dp = Dispatcher(storage=storage, events_isolation=create_events_isolation(storage))
         logger.info("Диспетчер инициализирован")
 
         # Регистрация роутеров
@@ -72,24 +235,43 @@ async def main():
 
         logger.info("Роутеры зарегистрированы")
 
-        # Регистрация функций startup и shutdown
+        # Регистрация функций startup и shutdown и общего обработчика ошибок
         dp.startup.register(misc.on_start)
         dp.shutdown.register(misc.on_shutdown)
-        logger.info("Обработчики startup/shutdown зарегистрированы")
+        dp.errors.register(misc.on_error)
+        logger.info("Обработчики startup/shutdown/errors зарегистрированы")
 
         # Удаление вебхука и пропуск апдейтов
         await bot.delete_webhook(drop_pending_updates=True)
         logger.info("Вебхук удален, апдейты пропущены")
 
-        # Запуск polling
-        logger.info("Запуск polling")
-        await dp.start_polling(bot)
+        # Запуск polling: длинный таймаут сокращает пустые запросы getUpdates,
+        # а allowed_updates ограничивает апдейты типами, для которых есть обработчики.
+        # Апдейты обрабатываются отдельными задачами, чтобы долгий запрос к OpenAI
+        # одного пользователя не задерживал остальных; число задач ограничено.
+        allowed_updates = dp.resolve_used_update_types()
+        logger.info("Запуск polling, allowed_updates=%s", allowed_updates)
+        await dp.start_polling(
+            bot,
+            polling_timeout=POLLING_TIMEOUT,
+            allowed_updates=allowed_updates,
+            handle_as_tasks=True,
+            tasks_concurrency_limit=TASKS_CONCURRENCY_LIMIT
+        )
 
     except Exception as e:
-        logger.error(f"Ошибка при запуске бота: {str(e)}")
+        logger.error("Ошибка при запуске бота: %s", e)
         raise
+    finally:
+        flush_task.cancel()
 
 if __name__ == '__main__':
+    # Только проверка конфигурации (например, в CI)
+    if '--check-config' in sys.argv:
+        Config.validate()
+        print('Конфигурация корректна')
+        sys.exit(0)
+
     # Настройка логирования
     setup_logging()
 
@@ -99,6 +281,7 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем (KeyboardInterrupt)")
     except Exception as e:
-        logger.error(f"Критическая ошибка: {str(e)}")
+        logger.error("Критическая ошибка: %s", e)
     finally:
-        logger.info("Завершение работы бота")
\ No newline at end of file
+        logger.info("Завершение работы бота")
+        misc.stop_log_listener()
@@ -3,6 +3,7 @@ from pathlib import Path
 from typing import Dict, Optional
 from enum import Enum
 from dotenv import load_dotenv
+from utils.session_store import SessionStore
 
 load_dotenv()
 
@@ -12,6 +13,30 @@ IMAGES_DIR = "images"
 PROMPTS_DIR = "prompts"
 MESSAGES_DIR = "messages"
 
+def _read_text(path: Path) -> str:
+    """
+    Чтение текстового файла в UTF-8 напрямую через файловый дескриптор.
+
+    На Linux файл открывается с O_NOATIME, чтобы чтение не обновляло время доступа.
+    Флаг допустим только для владельца файла, поэтому при PermissionError файл
+    открывается без него. Переводы строк приводятся к "\\n", как при open() в текстовом режиме.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOATIME", 0))
+    except PermissionError:
+        fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while chunk := os.read(fd, 65536):
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b"".join(chunks).decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+def _load_resource_dir(directory: Path) -> Dict[str, str]:
+    """Чтение всех .txt файлов директории в словарь {имя файла без расширения: содержимое}."""
+    return {path.stem: _read_text(path) for path in directory.glob("*.txt")}
+
 class PersonEnum(str, Enum):
     """Перечисление для имен виртуальных персонажей."""
     COBAIN = "cobain"
@@ -39,20 +64,52 @@ class Config:
         TELEGRAM_TOKEN: Токен Telegram-бота из переменных окружения.
         OPENAI_API_KEY: Ключ API OpenAI из переменных окружения.
         PROXY: Необязательный URL прокси для API-запросов.
-        USER_QUIZZES: Хранилище в памяти для состояния викторин пользователей.
-        USER_SESSIONS: Хранилище в памяти для данных сессий пользователей.
+        BOT_API_URL: Базовый URL сервера Telegram Bot API (можно указать локальный сервер).
+        REDIS_URL: Необязательный URL Redis для хранения состояний FSM.
+        FSM_TTL: Время жизни состояния и данных FSM в Redis (секунды).
+        REDIS_MAX_CONNECTIONS: Максимальное число соединений с Redis.
+        GPT_CACHE_ENABLED: Включает кэш ответов ChatGPT в режимах /gpt, /talk и /translate.
+        GPT_CACHE_SIZE: Максимальное количество ответов в кэше.
+        GPT_CACHE_TTL: Время жизни ответа в кэше (секунды).
+        GPT_SEMANTIC_CACHE_ENABLED: Включает поиск в кэше по близости эмбеддингов вопросов.
+        GPT_SEMANTIC_CACHE_SIZE: Максимальное количество записей семантического кэша (на режим или персонажа).
+        GPT_SEMANTIC_CACHE_THRESHOLD: Минимальное косинусное сходство для попадания в кэш.
+        GPT_POOL_SIZE: Количество заранее полученных случайных фактов и первых вопросов квиза.
+        USER_QUIZZES: Ограниченное хранилище в памяти для состояния викторин пользователей.
         PERSONS: Соответствие ключей персонажей и их отображаемых имен.
         IMAGE_PATHS: Соответствие ключей изображений и путей к файлам.
+        IMAGE_BYTES: Кэш содержимого файлов изображений по пути.
+        IMAGE_FILE_IDS: Кэш file_id загруженных в Telegram изображений по пути.
+        IMAGE_FILE_IDS_FILE: Файл, в котором кэш file_id сохраняется между запусками.
         LANGUAGES: Соответствие отображаемых имен языков и их кодов.
+        PROMPTS: Содержимое файлов промптов, загруженное при импорте.
+        MESSAGES: Содержимое файлов сообщений, загруженное при импорте.
     """
+    # Все значения хранятся на уровне класса, у экземпляров нет собственного состояния
+    __slots__ = ()
+
     # Переменные окружения
     TELEGRAM_TOKEN: Optional[str] = os.getenv("TOKEN")
     OPENAI_API_KEY: Optional[str] = os.getenv("GPT_TOKEN")
     PROXY: Optional[str] = os.getenv("PROXY")
+    BOT_API_URL: str = os.getenv("BOT_API_URL", "https://api.telegram.org")
+
+    # Хранилище состояний FSM (по умолчанию в памяти)
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+    FSM_TTL: int = int(os.getenv("FSM_TTL", "3600"))
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
 
-    # Хранилища в памяти (рассмотрите потокобезопасные альтернативы для продакшена)
-    USER_QUIZZES: Dict[int, Dict[str, str]] = {}  # {user_id: {"topic": topic, "score": 0, "current_question": ""}}
-    USER_SESSIONS: Dict[int, Dict[str, str]] = {}  # {user_id: {"personality": prompt}}
+    # Кэш ответов ChatGPT
+    GPT_CACHE_ENABLED: bool = os.getenv("GPT_CACHE_ENABLED", "true").lower() == "true"
+    GPT_CACHE_SIZE: int = int(os.getenv("GPT_CACHE_SIZE", "10000"))
+    GPT_CACHE_TTL: int = int(os.getenv("GPT_CACHE_TTL", "86400"))
+    GPT_SEMANTIC_CACHE_ENABLED: bool = os.getenv("GPT_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    GPT_SEMANTIC_CACHE_SIZE: int = int(os.getenv("GPT_SEMANTIC_CACHE_SIZE", "2000"))
+    GPT_SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("GPT_SEMANTIC_CACHE_THRESHOLD", "0.9"))
+    GPT_POOL_SIZE: int = int(os.getenv("GPT_POOL_SIZE", "3"))
+
+    # Хранилища в памяти с ограничением размера и временем жизни записей
+    USER_QUIZZES: SessionStore = SessionStore(maxsize=10_000, ttl=3600)  # {user_id: {"topic": topic, "score": 0, "current_question": ""}}
 
     # Соответствия персонажей
     PERSONS: Dict[str, str] = {
@@ -66,22 +123,34 @@ class Config:
     # Базовый путь к ресурсам
     _BASE_PATH: Path = Path(__file__).parent.resolve()
 
+    # Промпты и сообщения читаются с диска один раз при импорте
+    PROMPTS: Dict[str, str] = _load_resource_dir(_BASE_PATH / RESOURCES_DIR / PROMPTS_DIR)
+    MESSAGES: Dict[str, str] = _load_resource_dir(_BASE_PATH / RESOURCES_DIR / MESSAGES_DIR)
+
+    # Директория изображений вычисляется один раз
+    _IMAGES_PATH: Path = _BASE_PATH / RESOURCES_DIR / IMAGES_DIR
+
     # Пути к изображениям
     IMAGE_PATHS: Dict[str, str] = {
-        "random": str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "random.jpg"),
-        "gpt": str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "gpt.jpg"),
-        "talk": str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "talk.jpg"),
-        "quiz": str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "quiz.jpg"),
-        "main": str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "main.jpg"),
-        PersonEnum.COBAIN: str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "talk_cobain.jpg"),
-        PersonEnum.HAWKING: str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "talk_hawking.jpg"),
-        PersonEnum.NIETZSCHE: str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "talk_nietzsche.jpg"),
-        PersonEnum.QUEEN: str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "talk_queen.jpg"),
-        PersonEnum.TOLKIEN: str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "talk_tolkien.jpg"),
-        "translate": str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "translate.jpg"),
-        "voice_gpt": str(_BASE_PATH / RESOURCES_DIR / IMAGES_DIR / "voice_gpt.jpg"),
+        "random": str(_IMAGES_PATH / "random.jpg"),
+        "gpt": str(_IMAGES_PATH / "gpt.jpg"),
+        "talk": str(_IMAGES_PATH / "talk.jpg"),
+        "quiz": str(_IMAGES_PATH / "quiz.jpg"),
+        "main": str(_IMAGES_PATH / "main.jpg"),
+        PersonEnum.COBAIN: str(_IMAGES_PATH / "talk_cobain.jpg"),
+        PersonEnum.HAWKING: str(_IMAGES_PATH / "talk_hawking.jpg"),
+        PersonEnum.NIETZSCHE: str(_IMAGES_PATH / "talk_nietzsche.jpg"),
+        PersonEnum.QUEEN: str(_IMAGES_PATH / "talk_queen.jpg"),
+        PersonEnum.TOLKIEN: str(_IMAGES_PATH / "talk_tolkien.jpg"),
+        "translate": str(_IMAGES_PATH / "translate.jpg"),
+        "voice_gpt": str(_IMAGES_PATH / "voice_gpt.jpg"),
     }
 
+    # Кэши изображений, заполняются при первой отправке (см. utils.images.answer_cached_photo)
+    IMAGE_BYTES: Dict[str, bytes] = {}
+    IMAGE_FILE_IDS: Dict[str, str] = {}
+    IMAGE_FILE_IDS_FILE: Path = _BASE_PATH / "image_file_ids.json"
+
     # Соответствия языков
     LANGUAGES: Dict[str, str] = {
         "Английский": LanguageEnum.ENGLISH,
@@ -94,22 +163,60 @@ class Config:
         "Корейский": LanguageEnum.KOREAN,
     }
 
-    def __init__(self):
-        """Инициализация и валидация конфигурации."""
-        self._validate_env_vars()
-        self._validate_image_paths()
+    @classmethod
+    def validate(cls) -> None:
+        """
+        Проверка конфигурации: переменных окружения и файлов изображений.
+
+        Вызывается один раз при запуске бота.
 
-    def _validate_env_vars(self) -> None:
+        Исключения:
+            ValueError: Если не задана обязательная переменная окружения.
+            FileNotFoundError: Если отсутствует файл изображения.
+        """
+        cls._validate_env_vars()
+        cls._validate_image_paths()
+
+    @classmethod
+    def reload(cls) -> None:
+        """
+        Повторное чтение промптов и сообщений с диска без перезапуска бота.
+
+        Словари обновляются на месте, поэтому обработчики сразу видят новые тексты.
+        Кэши изображений очищаются: файлы будут прочитаны и загружены в Telegram заново.
+        """
+        prompts = _load_resource_dir(cls._BASE_PATH / RESOURCES_DIR / PROMPTS_DIR)
+        messages = _load_resource_dir(cls._BASE_PATH / RESOURCES_DIR / MESSAGES_DIR)
+        cls.PROMPTS.clear()
+        cls.PROMPTS.update(prompts)
+        cls.MESSAGES.clear()
+        cls.MESSAGES.update(messages)
+        cls.IMAGE_BYTES.clear()
+        cls.IMAGE_FILE_IDS.clear()
+
+    @classmethod
+    def _validate_env_vars(cls) -> None:
         """Проверка наличия обязательных переменных окружения."""
-        if not self.TELEGRAM_TOKEN:
+        if not cls.TELEGRAM_TOKEN:
             raise ValueError("Переменная окружения TELEGRAM_TOKEN не установлена")
-        if not self.OPENAI_API_KEY:
+        if not cls.OPENAI_API_KEY:
             raise ValueError("Переменная окружения OPENAI_API_KEY не установлена")
 
-    def _validate_image_paths(self) -> None:
-        """Проверка существования всех файлов изображений."""
-        for key, path in self.IMAGE_PATHS.items():
-            if not Path(path).is_file():
+    @classmethod
+    def _validate_image_paths(cls) -> None:
+        """Проверка существования всех файлов изображений одним чтением директории изображений."""
+        try:
+            with os.scandir(cls._IMAGES_PATH) as entries:
+                present = {entry.name for entry in entries if entry.is_file()}
+        except FileNotFoundError:
+            present = set()
+        for key, path in cls.IMAGE_PATHS.items():
+            image_path = Path(path)
+            if image_path.parent == cls._IMAGES_PATH:
+                exists = image_path.name in present
+            else:
+                exists = image_path.is_file()
+            if not exists:
                 raise FileNotFoundError(f"Файл изображения для '{key}' не найден по пути: {path}")
 
     @staticmethod
@@ -120,48 +227,39 @@ class Config:
     @staticmethod
     def get_prompts(prompt: str) -> str:
         """
-        Чтение файла промпта из директории prompts.
+        Получение текста промпта из директории prompts.
 
         Аргументы:
             prompt: Имя файла промпта (без расширения .txt).
 
         Возвращает:
-            Содержимое файла промпта.
+            Содержимое файла промпта, загруженное при импорте.
 
         Исключения:
             FileNotFoundError: Если файл промпта не существует.
-            IOError: Если файл не может быть прочитан.
         """
-        file_path = Config._get_resource_path(PROMPTS_DIR, f"{prompt}.txt")
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
-        except FileNotFoundError:
+            return Config.PROMPTS[prompt]
+        except KeyError:
+            file_path = Config._get_resource_path(PROMPTS_DIR, f"{prompt}.txt")
             raise FileNotFoundError(f"Файл промпта не найден: {file_path}")
-        except IOError as e:
-            raise IOError(f"Ошибка чтения файла промпта {file_path}: {str(e)}")
 
     @staticmethod
     def get_messages(message: str) -> str:
         """
-        Чтение файла сообщения из директории messages.
+        Получение текста сообщения из директории messages.
 
         Аргументы:
             message: Имя файла сообщения (без расширения .txt).
 
         Возвращает:
-            Содержимое файла сообщения.
+            Содержимое файла сообщения, загруженное при импорте.
 
         Исключения:
             FileNotFoundError: Если файл сообщения не существует.
-            IOError: Если файл не может быть прочитан.
         """
-        file_path = Config._get_resource_path(MESSAGES_DIR, f"{message}.txt")
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
-        except FileNotFoundError:
+            return Config.MESSAGES[message]
+        except KeyError:
+            file_path = Config._get_resource_path(MESSAGES_DIR, f"{message}.txt")
             raise FileNotFoundError(f"Файл сообщения не найден: {file_path}")
-        except IOError as e:
-            raise IOError(f"Ошибка чтения файла сообщения {file_path}: {str(e)}")
-
@@ -9,8 +9,10 @@ from .quiz import quiz_router
 from .voice_gpt import voice_router
 
 
-all_handlers = Router()
-all_handlers.include_routers(
+# Порядок роутеров определяет порядок проверки фильтров:
+# comm_router (/start) проверяется первым, voice_router с универсальным
+# обработчиком callback-запросов должен оставаться последним
+_ROUTERS = (
     comm_router,
     trans_router,
     rand_router,
@@ -18,9 +20,11 @@ all_handlers.include_routers(
     quiz_router,
     talk_router,
     voice_router,
-
 )
 
+all_handlers = Router()
+all_handlers.include_routers(*_ROUTERS)
+
 
 __all__ = [
     'all_handlers',
@@ -9,114 +9,125 @@
 - Очистка сессий пользователя при возврате в стартовое меню
 - Поддержка команд /state и /reset для диагностики
 - Обработка всех необработанных callback-запросов
+
+Непредвиденные ошибки обработчиков перехватывает misc.on_error.
 """
 import logging
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from keybords import Keyboards
+from keybords import Keyboards, CallbackData
 from config import Config
-from utils.images import send_image
+from utils.images import answer_cached_photo
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
-logger.info(f"Config.IMAGE_PATHS: {Config.IMAGE_PATHS}, Config.get_messages('main'): {Config.get_messages('main')}")
 
 # Инициализация роутера для обработки команд
 comm_router = Router()
 
 
-
-@comm_router.message(Command("start"))
-async def handle_start(message: Message, state: FSMContext = None) -> None:
+def _reset_user(user_id: int) -> None:
     """
-    Обработчик команды /start.
-
-    Действия:
-    1. Отправляет главное изображение с подписью из конфига и главным меню
-    2. Очищает сессии пользователя
-    3. Сбрасывает состояние FSM (если передан state)
+    Удаляет все сессии пользователя из хранилищ в памяти.
 
     Args:
-        message: Объект сообщения от пользователя
-        state: Контекст состояния FSM (опционально, для callback)
+        user_id: ID пользователя
     """
+    Config.USER_QUIZZES.pop(user_id, None)
 
-    user_id = message.from_user.id
-    logger.debug(f"Пользователь {user_id} вызвал команду /start")
 
+MAIN_TEXT_DEFAULT = "Добро пожаловать! Выберите действие в меню."
+
+
+async def _send_main_menu(message: Message, user_id: int) -> None:
+    """
+    Отправляет главное изображение с подписью из конфига и главным меню.
+
+    Args:
+        message: Сообщение, в чат которого отправляется меню
+        user_id: ID пользователя (для логирования)
+    """
     # Получаем текст сообщения
-    answer_text = Config.get_messages('main') or "Добро пожаловать! Выберите действие в меню."
+    answer_text = Config.get_messages('main') or MAIN_TEXT_DEFAULT
 
     # Отправка изображения с подписью
     try:
         image_path = Config.IMAGE_PATHS['main']
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
+        await answer_cached_photo(
+            message,
+            image_path,
             caption=answer_text,
             reply_markup=Keyboards.main_menu()
         )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={user_id}")
+        logger.debug("Отправлено изображение %s с подписью для user_id=%s", image_path, user_id)
     except KeyError:
-        logger.warning(f"Изображение 'main' не найдено в Config.IMAGE_PATHS")
+        logger.warning("Изображение 'main' не найдено в Config.IMAGE_PATHS")
         await message.answer(
             answer_text,
             reply_markup=Keyboards.main_menu()
         )
     except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
+        logger.error("Файл изображения %s не найден", image_path)
         await message.answer(
             answer_text,
             reply_markup=Keyboards.main_menu()
         )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте позже.",
-            reply_markup=Keyboards.main_menu()
-        )
-        return
 
-    # Очищаем сессии
-    try:
-        if user_id in Config.USER_SESSIONS:
-            del Config.USER_SESSIONS[user_id]
-            logger.debug(f"Очищена сессия USER_SESSIONS для user_id={user_id}")
-        if user_id in Config.USER_QUIZZES:
-            del Config.USER_QUIZZES[user_id]
-            logger.debug(f"Очищена сессия USER_QUIZZES для user_id={user_id}")
-    except Exception as e:
-        logger.error(f"Ошибка очистки сессий для user_id={user_id}: {str(e)}")
-
-    # Сбрасываем состояние FSM, если state передан
+
+async def _reset_user_state(user_id: int, state: FSMContext = None) -> None:
+    """
+    Очищает сессии пользователя и сбрасывает состояние FSM (если передан state).
+
+    Args:
+        user_id: ID пользователя
+        state: Контекст состояния FSM (опционально)
+    """
+    _reset_user(user_id)
+    logger.debug("Очищены сессии для user_id=%s", user_id)
+
     if state:
         await state.clear()
-        logger.debug(f"Сброшено состояние FSM для user_id={user_id}")
+        logger.debug("Сброшено состояние FSM для user_id=%s", user_id)
+
+
+@comm_router.message(Command("start"))
+async def handle_start(message: Message, state: FSMContext = None) -> None:
+    """
+    Обработчик команды /start.
+
+    Действия:
+    1. Отправляет главное изображение с подписью из конфига и главным меню
+    2. Очищает сессии пользователя
+    3. Сбрасывает состояние FSM (если передан state)
+
+    Args:
+        message: Объект сообщения от пользователя
+        state: Контекст состояния FSM (опционально)
+    """
+    user_id = message.from_user.id
+    logger.debug("Пользователь %s вызвал команду /start", user_id)
+
+    await _send_main_menu(message, user_id)
+    await _reset_user_state(user_id, state)
 
-@comm_router.callback_query(F.data == "start")
+@comm_router.callback_query(F.data == CallbackData.START.value)
 async def handle_start_callback(callback: CallbackQuery, state: FSMContext) -> None:
     """
     Обработчик callback-запроса с данными "start".
 
     Действия:
-    1. Вызывает обработчик команды /start
-    2. Подтверждает callback
+    1. Подтверждает callback
+    2. Очищает сессии пользователя и сбрасывает состояние FSM
+    3. Отправляет главное меню
 
     Args:
         callback: Объект callback-запроса от кнопки
         state: Контекст состояния FSM
     """
+    await callback.answer()
     user_id = callback.from_user.id
-    logger.debug(f"Пользователь {user_id} вызвал callback 'start'")
-    try:
-        await handle_start(callback.message, state)
-        await callback.answer()
-    except Exception as e:
-        logger.error(f"Ошибка обработки callback 'start' для user_id={user_id}: {str(e)}")
-        await callback.message.answer(
-            "Произошла ошибка. Попробуйте позже.",
-            reply_markup=Keyboards.main_menu()
-        )
-    await callback.answer()
\ No newline at end of file
+    logger.debug("Пользователь %s вызвал callback 'start'", user_id)
+    await _reset_user_state(user_id, state)
+    await _send_main_menu(callback.message, user_id)
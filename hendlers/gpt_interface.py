@@ -2,21 +2,25 @@
 Модуль для взаимодействия с ChatGPT в Telegram-боте.
 
 Основные функции:
-- Активация диалога по команде /gpt или упоминанию "gpt"
+- Активация диалога по команде /gpt или сообщению, начинающемуся с "gpt"
 - Обработка вопросов пользователей через ChatGPT API
+- Постепенный вывод ответа в подпись к изображению по мере генерации
 - Использование Finite State Machine (FSM) для управления диалогом
 - Предоставление клавиатуры для завершения диалога
 - Отправка тематических изображений для улучшения UX
 """
 import logging
+import re
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from keybords import Keyboards, CallbackData
-from utils.chatgpt import get_chatgpt_response
+from utils.chatgpt import get_cached_chatgpt_response, peek_cached_response
 from config import Config
 from utils.callback_finality import callback_finality
+from utils.images import answer_cached_photo
+from utils.caption_stream import CaptionStream
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -24,6 +28,9 @@ logger = logging.getLogger(__name__)
 # Создаем роутер для обработки сообщений, связанных с ChatGPT
 gpt_router = Router()
 
+# Команда /gpt или "gpt" в начале сообщения, в том числе кнопка главного меню "🤖 /gpt - ..."
+GPT_TRIGGER = re.compile(r"^(?:[^\w\s]+\s+)?/?gpt\b", re.IGNORECASE)
+
 class ChatState(StatesGroup):
     """
     Класс состояний Finite State Machine (FSM) для управления диалогом с ChatGPT.
@@ -33,12 +40,12 @@ class ChatState(StatesGroup):
     """
     waiting_for_question = State()
 
-@gpt_router.message(F.text.lower().contains("gpt"))
+@gpt_router.message(F.text.regexp(GPT_TRIGGER))
 async def handle_gpt(message: Message, state: FSMContext):
     """
     Обработчик команды запуска диалога с ChatGPT.
 
-    Активируется по команде /gpt или при упоминании "gpt" в тексте.
+    Активируется по команде /gpt, кнопке главного меню или сообщению, начинающемуся с "gpt".
 
     Args:
         message: Объект сообщения от пользователя
@@ -48,7 +55,7 @@ async def handle_gpt(message: Message, state: FSMContext):
         1. Отправляет тематическое изображение с приветственным текстом и клавиатурой
         2. Устанавливает состояние ожидания вопроса
     """
-    logger.debug(f"Пользователь {message.from_user.id} запустил диалог с ChatGPT")
+    logger.debug("Пользователь %s запустил диалог с ChatGPT", message.from_user.id)
 
     # Получаем приветственное сообщение
     answer_text = Config.get_messages('gpt') or "Задайте свой вопрос ChatGPT:"
@@ -56,13 +63,13 @@ async def handle_gpt(message: Message, state: FSMContext):
     # Отправляем изображение с подписью и клавиатурой
     try:
         image_path = Config.IMAGE_PATHS["gpt"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
+        await answer_cached_photo(
+            message,
+            image_path,
             caption=answer_text,
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
+        logger.debug("Отправлено изображение %s с подписью для user_id=%s", image_path, message.from_user.id)
     except KeyError:
         logger.warning("Изображение для команды 'gpt' не найдено")
         await message.answer(
@@ -70,13 +77,13 @@ async def handle_gpt(message: Message, state: FSMContext):
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
     except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
+        logger.error("Файл изображения %s не найден", image_path)
         await message.answer(
             answer_text,
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
     except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
+        logger.error("Ошибка отправки изображения: %s", e)
         await message.answer(
             "Произошла ошибка. Попробуйте снова.",
             reply_markup=Keyboards.get_gpt_exit_keyboard()
@@ -85,7 +92,7 @@ async def handle_gpt(message: Message, state: FSMContext):
 
     # Устанавливаем состояние ожидания вопроса
     await state.set_state(ChatState.waiting_for_question)
-    logger.debug(f"Установлено состояние ChatState.waiting_for_question для пользователя {message.from_user.id}")
+    logger.debug("Установлено состояние ChatState.waiting_for_question для пользователя %s", message.from_user.id)
 
 @gpt_router.message(ChatState.waiting_for_question)
 async def handle_chatgpt_question(message: Message, state: FSMContext):
@@ -97,33 +104,65 @@ async def handle_chatgpt_question(message: Message, state: FSMContext):
         state: Контекст состояния FSM
 
     Действия:
-        1. Отправляет запрос к ChatGPT API
-        2. Отправляет изображение с ответом ChatGPT и клавиатурой
+        1. Отправляет запрос к ChatGPT API (повторные вопросы берутся из кэша)
+        2. По мере генерации показывает ответ в подписи к изображению
+        3. Показывает полный ответ с клавиатурой
     """
-    logger.debug(f"Пользователь {message.from_user.id} задал вопрос: {message.text}")
+    logger.debug("Пользователь %s задал вопрос: %s", message.from_user.id, message.text)
 
-    # Отправляем запрос к ChatGPT
-    try:
-        response = await get_chatgpt_response(message.text)
-        logger.debug(f"Получен ответ от ChatGPT: {response}")
-    except Exception as e:
-        logger.error(f"Ошибка получения ответа от ChatGPT: {str(e)}")
+    # Сообщения без текста (стикеры, фото) не отправляются в ChatGPT
+    text = (message.text or "").strip()
+    if not text:
         await message.answer(
-            "Не удалось получить ответ. Попробуйте снова.",
+            "Пожалуйста, напишите вопрос текстом.",
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
         return
 
+    # Ответ из кэша отправляется сразу: заглушка и редактирование подписи не нужны
+    response = peek_cached_response(text)
+    stream = None
+    if response is None and "gpt" in Config.IMAGE_PATHS:
+        stream = CaptionStream(message, Config.IMAGE_PATHS["gpt"])
+        # Изображение отправляется одновременно с запросом к ChatGPT
+        stream.start()
+
+    # Отправляем запрос к ChatGPT
+    if response is None:
+        try:
+            response = await get_cached_chatgpt_response(
+                text,
+                on_partial=stream.update if stream is not None else None
+            )
+            logger.debug("Получен ответ от ChatGPT: %s", response)
+        except Exception as e:
+            logger.error("Ошибка получения ответа от ChatGPT: %s", e)
+            if stream is not None:
+                await stream.cancel()
+            await message.answer(
+                "Не удалось получить ответ. Попробуйте снова.",
+                reply_markup=Keyboards.get_gpt_exit_keyboard()
+            )
+            return
+
+    # Показываем полный ответ в уже отправленном изображении
+    if stream is not None:
+        try:
+            if await stream.finish(response, reply_markup=Keyboards.get_gpt_exit_keyboard()):
+                return
+        except Exception as e:
+            logger.error("Ошибка вывода ответа в подпись: %s", e)
+
     # Отправляем изображение с ответом и клавиатурой
     try:
         image_path = Config.IMAGE_PATHS["gpt"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
+        await answer_cached_photo(
+            message,
+            image_path,
             caption=response,
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
-        logger.debug(f"Отправлено изображение {image_path} с ответом для user_id={message.from_user.id}")
+        logger.debug("Отправлено изображение %s с ответом для user_id=%s", image_path, message.from_user.id)
     except KeyError:
         logger.warning("Изображение для команды 'gpt' не найдено")
         await message.answer(
@@ -131,19 +170,19 @@ async def handle_chatgpt_question(message: Message, state: FSMContext):
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
     except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
+        logger.error("Файл изображения %s не найден", image_path)
         await message.answer(
             response,
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
     except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
+        logger.error("Ошибка отправки изображения: %s", e)
         await message.answer(
             "Произошла ошибка. Попробуйте снова.",
             reply_markup=Keyboards.get_gpt_exit_keyboard()
         )
 
-@gpt_router.callback_query(F.data == CallbackData.BREAK)
+@gpt_router.callback_query(F.data == CallbackData.BREAK.value)
 async def end_chat(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик завершения диалога с ChatGPT.
@@ -153,19 +192,18 @@ async def end_chat(callback: CallbackQuery, state: FSMContext):
         state: Контекст состояния FSM
 
     Действия:
-        1. Очищает состояние FSM
-        2. Отправляет изображение с сообщением о завершении и главным меню
-        3. Подтверждает обработку callback
+        1. Подтверждает обработку callback
+        2. Очищает состояние FSM
+        3. Отправляет изображение с сообщением о завершении и главным меню
     """
-
-    logger.debug(f"Пользователь {callback.from_user.id} завершил диалог с ChatGPT")
+    await callback.answer()
+    logger.debug("Пользователь %s завершил диалог с ChatGPT", callback.from_user.id)
     await state.clear()
 
 
     # Отправляем изображение с подписью и главным меню
     try:
         await callback_finality(callback)
-        logger.debug(f"Выполнена callback_finality для user_id={callback.from_user.id}")
+        logger.debug("Выполнена callback_finality для user_id=%s", callback.from_user.id)
     except Exception as e:
-        logger.error(f"Ошибка в callback_finality: {str(e)}")
-    await callback.answer()
+        logger.error("Ошибка в callback_finality: %s", e)
@@ -1,14 +1,20 @@
 """
 Модуль обработки квиза
 """
+import asyncio
 import logging
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Set
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from config import Config
-from utils.chatgpt import get_quiz_question, check_answer
+from utils.chatgpt import get_quiz_questions, check_answer
 from keybords import Keyboards, CallbackData
+from utils.images import CAPTION_LIMIT, answer_photo_or_text, edit_photo_or_answer
+from utils.keyword_filter import KeywordFilter
+from utils.session_store import SessionStore
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -26,10 +32,154 @@ class QuizStates(StatesGroup):
     answering_question = State()
     waiting_for_action = State()
 
+@dataclass(slots=True)
+class QuizData:
+    """
+    Данные квиза пользователя, хранящиеся в FSM одним значением.
+
+    Атрибуты:
+        topic: Текущая тема квиза
+        question: Текущий вопрос (он же исключается при запросе следующего)
+        score: Количество правильных ответов
+        questions: Еще не заданные вопросы из полученного пакета
+    """
+    topic: Optional[str] = None
+    question: Optional[str] = None
+    score: int = 0
+    questions: List[str] = field(default_factory=list)
+
+# Допустимые темы квиза и соответствующие им callback_data кнопок выбора темы
+_VALID_TOPICS = frozenset(("prog", "math", "biology"))
+_TOPIC_CBS = frozenset(f"{CallbackData.QUIZ_PREFIX.value}{topic}" for topic in _VALID_TOPICS)
+
+def _image_key(topic: Optional[str]) -> str:
+    """Ключ изображения темы, если оно настроено, иначе общего изображения квиза."""
+    return topic if topic in Config.IMAGE_PATHS else "quiz"
+
+# Подпись к вопросу: постоянные части и их суммарная длина
+_QUESTION_PREFIX = "Вопрос: "
+_QUESTION_SUFFIX = "\n\nНапиши свой ответ:"
+_QUESTION_MAX_LEN = CAPTION_LIMIT - len(_QUESTION_PREFIX) - len(_QUESTION_SUFFIX)
+
+def _question_caption(question: str) -> str:
+    """Подпись к вопросу; обрезается сам вопрос, чтобы приглашение к ответу сохранилось."""
+    if len(question) > _QUESTION_MAX_LEN:
+        question = question[:_QUESTION_MAX_LEN - 3] + "..."
+    return _QUESTION_PREFIX + question + _QUESTION_SUFFIX
+
+# Ключ данных квиза в хранилище FSM
+QUIZ_DATA_KEY = "quiz"
+
+async def _load_quiz(state: FSMContext) -> QuizData:
+    """
+    Читает данные квиза из FSM одним обращением к хранилищу.
+
+    Args:
+        state: Текущее состояние FSM
+
+    Returns:
+        Данные квиза (пустые, если квиз не начат)
+    """
+    user_data = await state.get_data()
+    return QuizData(**user_data.get(QUIZ_DATA_KEY, {}))
+
+async def _save_quiz(state: FSMContext, quiz: QuizData) -> None:
+    """
+    Записывает данные квиза в FSM одним обращением к хранилищу.
+
+    Во время квиза данные FSM состоят только из данных квиза, поэтому они
+    перезаписываются целиком (update_data потребовал бы лишнего чтения).
+
+    Args:
+        state: Текущее состояние FSM
+        quiz: Данные квиза
+    """
+    await state.set_data({QUIZ_DATA_KEY: asdict(quiz)})
+
 # Создаем роутер для обработки команд и сообщений, связанных с квизом
 quiz_router = Router()
 
-@quiz_router.message(F.text.lower().contains("quiz"))
+# Максимальное время ожидания предзагруженного вопроса (секунды)
+PREFETCH_TIMEOUT = 30
+
+# Предзагруженные пакеты вопросов: {user_id: (тема, задача получения пакета)}.
+# Задачи не сериализуются, поэтому хранятся вне FSM; записи пользователей,
+# бросивших квиз, удаляются по истечении времени жизни данных FSM.
+_prefetched_questions: SessionStore = SessionStore(maxsize=10_000, ttl=Config.FSM_TTL)
+
+# Фоновые задачи подтверждения callback: ссылки хранятся до завершения задач
+_background_tasks: Set[asyncio.Task] = set()
+
+def _answer_in_background(callback: CallbackQuery) -> None:
+    """
+    Подтверждает callback в фоне, не дожидаясь ответа Telegram.
+
+    Запрос к ChatGPT начинается сразу, а не после подтверждения нажатия.
+
+    Args:
+        callback: Объект callback от нажатия кнопки
+    """
+    async def _ack() -> None:
+        # callback.answer() возвращает объект метода Telegram, а не корутину
+        await callback.answer()
+
+    task = asyncio.create_task(_ack())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    # Забираем исключение, чтобы незавершенное подтверждение не выдавало предупреждений
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+def _prefetch_questions(user_id: int, topic: str, previous_question: str) -> None:
+    """
+    Запускает фоновое получение следующего пакета вопросов, пока проверяется ответ пользователя.
+
+    Args:
+        user_id: ID пользователя
+        topic: Тема квиза
+        previous_question: Текущий вопрос, который не должен повториться
+    """
+    _cancel_prefetch(user_id)
+    task = asyncio.create_task(get_quiz_questions(topic, previous_question))
+    # Забираем исключение, чтобы неиспользованная задача не выдавала предупреждений
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    _prefetched_questions[user_id] = (topic, task)
+
+def _cancel_prefetch(user_id: int) -> None:
+    """
+    Отменяет предзагрузку вопросов для пользователя, если она есть.
+
+    Args:
+        user_id: ID пользователя
+    """
+    entry = _prefetched_questions.pop(user_id, None)
+    if entry is not None:
+        entry[1].cancel()
+
+async def _get_next_questions(user_id: int, topic: str, previous_question: str) -> List[str]:
+    """
+    Возвращает предзагруженный пакет вопросов по теме или запрашивает новый.
+
+    Args:
+        user_id: ID пользователя
+        topic: Тема квиза
+        previous_question: Предыдущий вопрос
+
+    Returns:
+        Список текстов вопросов
+    """
+    entry = _prefetched_questions.pop(user_id, None)
+    if entry is not None:
+        prefetched_topic, task = entry
+        if prefetched_topic == topic:
+            try:
+                return await asyncio.wait_for(task, PREFETCH_TIMEOUT)
+            except Exception as e:
+                logger.warning("Предзагрузка вопросов для user_id=%s не удалась: %s", user_id, e)
+        else:
+            task.cancel()
+    return await get_quiz_questions(topic, previous_question)
+
+@quiz_router.message(KeywordFilter("quiz"))
 async def cmd_quiz(message: Message, state: FSMContext):
     """
     Обработчик команды начала квиза.
@@ -41,18 +191,14 @@ async def cmd_quiz(message: Message, state: FSMContext):
         message: Объект сообщения от пользователя
         state: Текущее состояние FSM
     """
-    logger.debug(f"Пользователь {message.from_user.id} начал квиз")
-    await state.clear()  # Очищаем состояние для нового квиза
+    logger.debug("Пользователь %s начал квиз", message.from_user.id)
+    _cancel_prefetch(message.from_user.id)
     await state.set_state(QuizStates.selecting_topic)
-    logger.debug(f"Установлено состояние QuizStates.selecting_topic для пользователя {message.from_user.id}")
-    await state.update_data(score=0)  # Инициализируем счёт
+    logger.debug("Установлено состояние QuizStates.selecting_topic для пользователя %s", message.from_user.id)
+    await _save_quiz(state, QuizData())  # Новый квиз: данные предыдущего перезаписываются, счёт обнуляется
 
     # Подготовка текста
     answer_text = Config.get_messages('quiz') or "Выберите тему квиза:"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для команды 'quiz' обрезана до 1024 символов: {answer_text}")
 
     keyboard = Keyboards.get_quiz_topics_keyboard()
     if keyboard is None:
@@ -61,114 +207,67 @@ async def cmd_quiz(message: Message, state: FSMContext):
         return
 
     # Отправляем изображение с текстом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["quiz"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=keyboard
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'quiz' не найдено")
-        await message.answer(
-            answer_text,
-            reply_markup=keyboard
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await message.answer(
-            answer_text,
-            reply_markup=keyboard
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=keyboard
-        )
+    await answer_photo_or_text(message, "quiz", answer_text, reply_markup=keyboard)
 
-@quiz_router.callback_query(F.data.in_([f"{CallbackData.QUIZ_PREFIX.value}{topic}" for topic in ["prog", "math", "biology"]]))
-async def process_topic_selection(callback: CallbackQuery, state: FSMContext):
+@quiz_router.callback_query(F.data.in_(_TOPIC_CBS))
+async def process_topic_selection(callback: CallbackQuery, state: FSMContext, raw_state: Optional[str] = None):
     """
     Обработчик выбора темы квиза с клавиатуры get_quiz_topics_keyboard.
 
-    Получает вопрос по выбранной теме, сохраняет тему и вопрос в состоянии FSM,
-    и отправляет изображение с вопросом.
+    Получает пакет вопросов по выбранной теме, сохраняет тему, первый вопрос
+    и оставшиеся вопросы в состоянии FSM и отправляет изображение с вопросом.
 
     Args:
         callback: Объект callback от нажатия кнопки
         state: Текущее состояние FSM
+        raw_state: Текущее состояние FSM, прочитанное диспетчером (передается aiogram)
     """
-    current_state = await state.get_state()
-    logger.debug(f"Получен callback: user={callback.from_user.id}, data={callback.data}, state={current_state}")
+    _answer_in_background(callback)
+    logger.debug("Получен callback: user=%s, data=%s, state=%s", callback.from_user.id, callback.data, raw_state)
 
     # Извлекаем тему из callback_data (например, "prog" из "quiz_prog")
-    topic = callback.data[len(CallbackData.QUIZ_PREFIX.value):]
-    logger.debug(f"Извлечена тема: {topic}")
+    topic = callback.data.removeprefix(CallbackData.QUIZ_PREFIX.value)
+    logger.debug("Извлечена тема: %s", topic)
 
     # Проверяем допустимость темы
-    valid_topics = ["prog", "math", "biology"]
-    if topic not in valid_topics:
-        logger.warning(f"Недопустимая тема: {topic}")
+    if topic not in _VALID_TOPICS:
+        logger.warning("Недопустимая тема: %s", topic)
         await callback.message.answer(
             "Эта тема недоступна. Выберите другую.",
             reply_markup=Keyboards.get_quiz_topics_keyboard()
         )
-        await callback.answer()
         return
 
-    # Получаем вопрос по выбранной теме
+    # Получаем пакет вопросов по выбранной теме
     try:
-        question = await get_quiz_question(topic)
-        logger.debug(f"Получен вопрос для темы '{topic}': {question}")
+        questions = await get_quiz_questions(topic)
+        logger.debug("Получено %s вопросов для темы '%s'", len(questions), topic)
     except Exception as e:
-        logger.error(f"Ошибка получения вопроса для темы '{topic}': {str(e)}")
+        logger.error("Ошибка получения вопроса для темы '%s': %s", topic, e)
         await callback.message.answer(
             "Не удалось загрузить вопрос. Попробуйте выбрать другую тему.",
             reply_markup=Keyboards.get_quiz_topics_keyboard()
         )
-        await callback.answer()
         return
 
-    # Сохраняем тему и вопрос в состоянии
-    await state.set_state(QuizStates.answering_question)
-    logger.debug(f"Установлено состояние QuizStates.answering_question для пользователя {callback.from_user.id}")
-    await state.update_data(
-        current_topic=topic,
-        current_question=question,
-        previous_question=question
+    # Сохраняем тему, вопрос и остаток пакета в состоянии (состояние и данные записываются одновременно)
+    quiz = await _load_quiz(state)
+    quiz.topic = topic
+    quiz.question = questions.pop(0)
+    quiz.questions = questions
+    question = quiz.question
+    await asyncio.gather(
+        state.set_state(QuizStates.answering_question),
+        _save_quiz(state, quiz)
     )
-    logger.debug(f"Сохранены данные: current_topic={topic}, current_question={question}")
+    logger.debug("Установлено состояние QuizStates.answering_question для пользователя %s, данные квиза: %s",
+                 callback.from_user.id, quiz)
 
     # Подготовка текста
-    answer_text = f"Вопрос: {question}\n\nНапиши свой ответ:"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для вопроса темы '{topic}' обрезана до 1024 символов: {answer_text}")
+    answer_text = _question_caption(question)
 
     # Отправляем изображение темы с вопросом
-    try:
-        image_path = Config.IMAGE_PATHS.get(topic, Config.IMAGE_PATHS["quiz"])  # Используем тему или quiz по умолчанию
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=answer_text
-        )
-        logger.debug(f"Отправлено изображение {image_path} с вопросом для user_id={callback.from_user.id}")
-    except KeyError:
-        logger.warning(f"Изображение для темы '{topic}' или 'quiz' не найдено")
-        await callback.message.answer(answer_text)
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await callback.message.answer(answer_text)
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await callback.message.answer("Произошла ошибка. Попробуйте снова.")
-
-    await callback.answer()
+    await answer_photo_or_text(callback.message, _image_key(topic), answer_text)
 
 @quiz_router.message(QuizStates.answering_question)
 async def process_user_answer(message: Message, state: FSMContext):
@@ -176,71 +275,57 @@ async def process_user_answer(message: Message, state: FSMContext):
     Обработчик ответа пользователя на вопрос квиза.
 
     Проверяет ответ, обновляет счёт, отправляет изображение с результатом и переходит в ожидание действия.
+    Если полученный пакет вопросов закончился, одновременно с проверкой ответа
+    в фоне запрашивается следующий пакет.
 
     Args:
         message: Объект сообщения с ответом пользователя
         state: Текущее состояние FSM
     """
-    user_data = await state.get_data()
-    question = user_data.get('current_question')
-    topic = user_data.get('current_topic')
-    user_answer = message.text
-    logger.debug(f"Пользователь {message.from_user.id} ответил: {user_answer} на вопрос: {question}")
+    # Сообщения без текста (стикеры, фото, голосовые) не отправляются на проверку
+    user_answer = (message.text or "").strip()
+    if not user_answer:
+        await message.answer("Пожалуйста, напишите ответ на вопрос текстом.")
+        return
+
+    quiz = await _load_quiz(state)
+    question = quiz.question
+    topic = quiz.topic
+    logger.debug("Пользователь %s ответил: %s на вопрос: %s", message.from_user.id, user_answer, question)
+
+    # Получаем следующий пакет вопросов параллельно с проверкой ответа
+    if topic and not quiz.questions:
+        _prefetch_questions(message.from_user.id, topic, question)
 
     # Проверяем ответ
     try:
-        result = await check_answer(question, user_answer)
+        is_correct, result = await check_answer(question, user_answer)
     except Exception as e:
-        logger.error(f"Ошибка проверки ответа: {str(e)}")
+        logger.error("Ошибка проверки ответа: %s", e)
         await message.answer("Ошибка при проверке ответа. Попробуйте снова.")
         return
 
-    score = user_data.get('score', 0)
-    if "Правильно!" in result:
-        score += 1  # Увеличиваем счёт за правильный ответ
-
-    await state.update_data(score=score)
-    logger.debug(f"Обновлен счёт: {score}, данные состояния: {await state.get_data()}")
+    quiz.score += int(is_correct)  # Увеличиваем счёт за правильный ответ
+    score = quiz.score
 
     # Подготовка текста
     answer_text = f"{result}\n\nТвой счёт: {score}"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для результата ответа обрезана до 1024 символов: {answer_text}")
 
     # Отправляем изображение темы с результатом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS.get(topic, Config.IMAGE_PATHS["quiz"])  # Используем тему или quiz по умолчанию
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=Keyboards.get_quiz_control_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с результатом для user_id={message.from_user.id}")
-    except KeyError:
-        logger.warning(f"Изображение для темы '{topic}' или 'quiz' не найдено")
-        await message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_quiz_control_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_quiz_control_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_quiz_control_keyboard()
-        )
+    await answer_photo_or_text(
+        message,
+        _image_key(topic),
+        answer_text,
+        reply_markup=Keyboards.get_quiz_control_keyboard()
+    )
 
-    # Переходим в состояние ожидания действия
-    await state.set_state(QuizStates.waiting_for_action)
-    logger.debug(f"Установлено состояние QuizStates.waiting_for_action для пользователя {message.from_user.id}")
+    # Сохраняем счёт и переходим в состояние ожидания действия
+    await asyncio.gather(
+        state.set_state(QuizStates.waiting_for_action),
+        _save_quiz(state, quiz)
+    )
+    logger.debug("Установлено состояние QuizStates.waiting_for_action для пользователя %s, счёт: %s",
+                 message.from_user.id, score)
 
 @quiz_router.message(QuizStates.waiting_for_action)
 async def handle_invalid_message(message: Message):
@@ -252,194 +337,126 @@ async def handle_invalid_message(message: Message):
     Args:
         message: Объект сообщения от пользователя
     """
-    logger.debug(f"Пользователь {message.from_user.id} отправил текстовое сообщение в состоянии waiting_for_action: {message.text}")
+    logger.debug("Пользователь %s отправил текстовое сообщение в состоянии waiting_for_action: %s", message.from_user.id, message.text)
     await message.answer(
         "Пожалуйста, выберите действие с помощью кнопок: 'Следующий вопрос', 'Сменить тему' или 'Завершить квиз'.",
         reply_markup=Keyboards.get_quiz_control_keyboard()
     )
 
 @quiz_router.callback_query(QuizStates.waiting_for_action, F.data == CallbackData.QUIZ_MORE.value)
-async def next_question(callback: CallbackQuery, state: FSMContext):
+async def next_question(callback: CallbackQuery, state: FSMContext, raw_state: Optional[str] = None):
     """
     Обработчик запроса следующего вопроса в текущей теме.
 
-    Получает новый вопрос (исключая повтор предыдущего) и отправляет изображение с вопросом.
+    Берет следующий вопрос из пакета, а если пакет закончился - предзагруженный
+    или новый пакет (исключая повтор предыдущего вопроса), и показывает вопрос
+    в сообщении с результатом вместо кнопок управления.
 
     Args:
         callback: Объект callback от нажатия кнопки
         state: Текущее состояние FSM
+        raw_state: Текущее состояние FSM, прочитанное диспетчером (передается aiogram)
     """
-    current_state = await state.get_state()
-    user_data = await state.get_data()
-    topic = user_data.get('current_topic')
-    previous_question = user_data.get('previous_question')
-    logger.debug(f"Пользователь {callback.from_user.id} запросил новый вопрос. Тема: {topic}, предыдущий вопрос: {previous_question}, состояние: {current_state}")
+    _answer_in_background(callback)
+    quiz = await _load_quiz(state)
+    topic = quiz.topic
+    previous_question = quiz.question
+    logger.debug("Пользователь %s запросил новый вопрос. Тема: %s, предыдущий вопрос: %s, состояние: %s", callback.from_user.id, topic, previous_question, raw_state)
 
     # Проверяем наличие темы
-    valid_topics = ["prog", "math", "biology"]
-    if not topic or topic not in valid_topics:
-        logger.error(f"Недопустимая или отсутствующая тема: '{topic}'. Данные состояния: {user_data}")
+    if topic not in _VALID_TOPICS:
+        logger.error("Недопустимая или отсутствующая тема: '%s'. Данные квиза: %s", topic, quiz)
         await callback.message.answer(
             "Тема квиза не определена. Выберите тему заново.",
             reply_markup=Keyboards.get_quiz_topics_keyboard()
         )
         await state.set_state(QuizStates.selecting_topic)
-        await callback.answer()
         return
 
-    # Получаем новый вопрос, исключая предыдущий
+    # Берем вопрос из пакета или получаем новый пакет, исключая предыдущий вопрос
     try:
-        question = await get_quiz_question(topic, previous_question)
-        logger.debug(f"Получен вопрос для темы '{topic}': {question}")
+        if not quiz.questions:
+            quiz.questions = await _get_next_questions(callback.from_user.id, topic, previous_question)
+            logger.debug("Получено %s вопросов для темы '%s'", len(quiz.questions), topic)
+        question = quiz.questions.pop(0)
     except Exception as e:
-        logger.error(f"Ошибка получения вопроса для темы '{topic}': {str(e)}")
+        logger.error("Ошибка получения вопроса для темы '%s': %s", topic, e)
         await callback.message.answer(
             "Не удалось загрузить вопрос. Попробуйте выбрать другую тему.",
             reply_markup=Keyboards.get_quiz_topics_keyboard()
         )
         await state.set_state(QuizStates.selecting_topic)
-        await callback.answer()
         return
 
-    await state.update_data(
-        current_question=question,
-        previous_question=question
-    )
-    logger.debug(f"Сохранены данные: current_question={question}")
-
     # Подготовка текста
-    answer_text = f"Вопрос: {question}\n\nНапиши свой ответ:"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для нового вопроса темы '{topic}' обрезана до 1024 символов: {answer_text}")
+    answer_text = _question_caption(question)
 
-    # Отправляем изображение темы с вопросом
-    try:
-        image_path = Config.IMAGE_PATHS.get(topic, Config.IMAGE_PATHS["quiz"])  # Используем тему или quiz по умолчанию
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=answer_text
-        )
-        logger.debug(f"Отправлено изображение {image_path} с вопросом для user_id={callback.from_user.id}")
-    except KeyError:
-        logger.warning(f"Изображение для темы '{topic}' или 'quiz' не найдено")
-        await callback.message.answer(answer_text)
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await callback.message.answer(answer_text)
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await callback.message.answer("Произошла ошибка. Попробуйте снова.")
+    # Заменяем сообщение с результатом изображением темы с вопросом
+    await edit_photo_or_answer(callback.message, _image_key(topic), answer_text)
 
-    # Переходим в состояние ответа на вопрос
-    await state.set_state(QuizStates.answering_question)
-    logger.debug(f"Установлено состояние QuizStates.answering_question для пользователя {callback.from_user.id}")
-    await callback.answer()
+    # Сохраняем вопрос и переходим в состояние ответа на вопрос.
+    # Следующий апдейт чата обрабатывается только после завершения обработчика (events isolation)
+    quiz.question = question
+    await asyncio.gather(
+        state.set_state(QuizStates.answering_question),
+        _save_quiz(state, quiz)
+    )
+    logger.debug("Установлено состояние QuizStates.answering_question для пользователя %s, данные квиза: %s",
+                 callback.from_user.id, quiz)
 
 @quiz_router.callback_query(QuizStates.waiting_for_action, F.data == CallbackData.CHANGE_TOPIC.value)
 async def change_topic(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик смены темы квиза.
 
-    Отправляет изображение с предложением выбрать новую тему.
+    Показывает в сообщении с результатом изображение с предложением выбрать новую тему.
 
     Args:
         callback: Объект callback от нажатия кнопки
         state: Текущее состояние FSM
     """
-    logger.debug(f"Пользователь {callback.from_user.id} запросил смену темы")
+    _answer_in_background(callback)
+    logger.debug("Пользователь %s запросил смену темы", callback.from_user.id)
+    _cancel_prefetch(callback.from_user.id)
     await state.set_state(QuizStates.selecting_topic)
 
     # Подготовка текста
     answer_text = "Выбери новую тему:"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для смены темы обрезана до 1024 символов: {answer_text}")
 
-    # Отправляем изображение с текстом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["quiz"]
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=Keyboards.get_quiz_topics_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={callback.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'quiz' не найдено")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_quiz_topics_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_quiz_topics_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await callback.message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_quiz_topics_keyboard()
-        )
-
-    await callback.answer()
+    # Заменяем сообщение с результатом изображением с текстом и клавиатурой
+    await edit_photo_or_answer(
+        callback.message,
+        "quiz",
+        answer_text,
+        reply_markup=Keyboards.get_quiz_topics_keyboard()
+    )
 
 @quiz_router.callback_query(QuizStates.waiting_for_action, F.data == CallbackData.END_QUIZ.value)
 async def end_quiz(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик завершения квиза.
 
-    Отправляет изображение с итоговым счётом и очищает состояние.
+    Показывает в сообщении с результатом изображение с итоговым счётом и очищает состояние.
 
     Args:
         callback: Объект callback от нажатия кнопки
         state: Текущее состояние FSM
     """
-    user_data = await state.get_data()
-    score = user_data.get('score', 0)
-    logger.debug(f"Пользователь {callback.from_user.id} завершил квиз с результатом {score}")
+    _answer_in_background(callback)
+    score = (await _load_quiz(state)).score
+    logger.debug("Пользователь %s завершил квиз с результатом %s", callback.from_user.id, score)
+    _cancel_prefetch(callback.from_user.id)
 
     # Подготовка текста
     answer_text = f"Квиз завершён! Твой итоговый счёт: {score}\nНапиши /quiz, если захочешь сыграть ещё раз.\n/start для возврата в основное меню"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для завершения квиза обрезана до 1024 символов: {answer_text}")
 
-    # Отправляем изображение с текстом и главным меню
-    try:
-        image_path = Config.IMAGE_PATHS["main"]
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=Keyboards.main_menu()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={callback.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'main' не найдено")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.main_menu()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.main_menu()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await callback.message.answer(
-            "Произошла ошибка. Попробуйте позже.",
-            reply_markup=Keyboards.main_menu()
-        )
+    # Главное меню - reply-клавиатура, поэтому итог отправляется новым сообщением
+    await answer_photo_or_text(
+        callback.message,
+        "main",
+        answer_text,
+        reply_markup=Keyboards.main_menu(),
+        error_text="Произошла ошибка. Попробуйте позже."
+    )
 
     await state.clear()  # Очищаем состояние
-    await callback.answer()
\ No newline at end of file
@@ -8,11 +8,13 @@
 """
 import logging
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from keybords import Keyboards, CallbackData
-from utils.chatgpt import get_chatgpt_response
+from utils.chatgpt import get_pooled_chatgpt_response
 from config import Config
 from utils.callback_finality import callback_finality
+from utils.images import answer_photo_or_text
+from utils.keyword_filter import KeywordFilter
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -20,26 +22,24 @@ logger = logging.getLogger(__name__)
 # Инициализация роутера для обработки случайных фактов
 rand_router = Router()
 
-@rand_router.message(F.text.lower().contains("random"))
-async def handle_random(message: Message):
+async def _send_random_fact(message: Message, user_id: int) -> None:
     """
-    Обработчик сообщений с запросом случайного факта.
+    Получает случайный факт от ChatGPT и отправляет его в чат сообщения.
 
     Параметры:
-    - message: Объект сообщения от пользователя
+    - message: Сообщение, в чат которого отправляется факт
+    - user_id: ID пользователя, запросившего факт (для логирования)
 
     Действия:
     1. Получает ответ от ChatGPT с использованием промпта для случайных фактов
     2. Отправляет изображение с фактом в качестве подписи и клавиатурой
     """
-    logger.debug(f"Пользователь {message.from_user.id} запросил случайный факт")
-
     # Получаем ответ от ChatGPT
     try:
-        response = await get_chatgpt_response(Config.get_prompts("random"))
-        logger.debug(f"Получен факт: {response}")
+        response = await get_pooled_chatgpt_response(Config.get_prompts("random"))
+        logger.debug("Получен факт для user_id=%s: %s", user_id, response)
     except Exception as e:
-        logger.error(f"Ошибка получения факта: {str(e)}")
+        logger.error("Ошибка получения факта: %s", e)
         await message.answer(
             "Не удалось получить факт. Попробуйте снова.",
             reply_markup=Keyboards.get_random_fact_keyboard()
@@ -47,35 +47,25 @@ async def handle_random(message: Message):
         return
 
     # Отправляем изображение с подписью и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["random"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption=response,
-            reply_markup=Keyboards.get_random_fact_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с фактом для user_id={message.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'random' не найдено")
-        await message.answer(
-            response,
-            reply_markup=Keyboards.get_random_fact_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await message.answer(
-            response,
-            reply_markup=Keyboards.get_random_fact_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_random_fact_keyboard()
-        )
+    await answer_photo_or_text(
+        message,
+        "random",
+        response,
+        reply_markup=Keyboards.get_random_fact_keyboard()
+    )
+
+@rand_router.message(KeywordFilter("random"))
+async def handle_random(message: Message):
+    """
+    Обработчик сообщений с запросом случайного факта.
+
+    Параметры:
+    - message: Объект сообщения от пользователя
+    """
+    logger.debug("Пользователь %s запросил случайный факт", message.from_user.id)
+    await _send_random_fact(message, message.from_user.id)
 
-@rand_router.callback_query(F.data == CallbackData.RANDOM)
+@rand_router.callback_query(F.data == CallbackData.RANDOM.value)
 async def handle_more_fact(callback: CallbackQuery):
     """
     Обработчик callback-запросов на получение дополнительного случайного факта.
@@ -85,13 +75,13 @@ async def handle_more_fact(callback: CallbackQuery):
 
     Действия:
     1. Отправляет подтверждение о получении callback
-    2. Вызывает handle_random для обработки запроса как обычного сообщения
+    2. Отправляет новый факт в чат нажатого сообщения
     """
-    logger.debug(f"Пользователь {callback.from_user.id} запросил ещё один факт")
+    logger.debug("Пользователь %s запросил ещё один факт", callback.from_user.id)
     await callback.answer()
-    await handle_random(callback.message)
+    await _send_random_fact(callback.message, callback.from_user.id)
 
-@rand_router.callback_query(F.data == CallbackData.MAIN_MENU)
+@rand_router.callback_query(F.data == CallbackData.MAIN_MENU.value)
 async def handle_end_random(callback: CallbackQuery):
     """
     Обработчик callback-запросов на завершение взаимодействия с фактами.
@@ -103,12 +93,12 @@ async def handle_end_random(callback: CallbackQuery):
     1. Отправляет подтверждение о получении callback
     2. Отправляет изображение с сообщением о завершении и главное меню
     """
-    logger.debug(f"Пользователь {callback.from_user.id} завершил взаимодействие с фактами")
+    logger.debug("Пользователь %s завершил взаимодействие с фактами", callback.from_user.id)
     await callback.answer()
 
     # Отправка изображения с подписью и главным меню
     try:
         await callback_finality(callback)
-        logger.debug(f"Выполнена callback_finality для user_id={callback.from_user.id}")
+        logger.debug("Выполнена callback_finality для user_id=%s", callback.from_user.id)
     except Exception as e:
-        logger.error(f"Ошибка в callback_finality: {str(e)}")
\ No newline at end of file
+        logger.error("Ошибка в callback_finality: %s", e)
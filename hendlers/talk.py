@@ -7,13 +7,19 @@
     - Ведения диалога с выбранным персонажем через ChatGPT
     - Отправки соответствующих изображений персонажей
 """
+import asyncio
 import logging
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery
 from keybords import Keyboards, CallbackData
-from utils.chatgpt import get_chatgpt_response
+from utils.chatgpt import get_cached_chatgpt_response, peek_cached_response
 from config import Config
 from utils.callback_finality import callback_finality
+from utils.caption_stream import CaptionStream
+from utils.images import answer_photo_or_text
+from utils.keyword_filter import KeywordFilter
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -21,7 +27,25 @@ logger = logging.getLogger(__name__)
 # Создаем роутер для обработки диалогов
 talk_router = Router()
 
-@talk_router.message(F.text.lower().contains("talk"))
+# Максимальная длина сообщения персонажу: длинный текст не отправляется в ChatGPT
+MAX_TALK_MESSAGE_LENGTH = 1000
+
+# Приветствия персонажей: {person_id: текст подписи после выбора персонажа}
+_PERSON_GREETINGS = {
+    person_id: f"Вы говорите с {person_name.upper()}. Отправьте сообщение:"
+    for person_id, person_name in Config.PERSONS.items()
+}
+
+class TalkState(StatesGroup):
+    """
+    Класс состояний FSM для диалога с персонажем.
+
+    Состояния:
+        chatting: Диалог с выбранным персонажем (person_id хранится в данных FSM)
+    """
+    chatting = State()
+
+@talk_router.message(KeywordFilter("talk"))
 async def handle_talk(message: Message):
     """
     Обрабатывает команду начала диалога (сообщение, содержащее 'talk').
@@ -36,10 +60,6 @@ async def handle_talk(message: Message):
 
     # Подготовка текста
     answer_text = Config.get_messages('talk') or "Выберите личность для диалога:"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для команды 'talk' обрезана до 1024 символов: {answer_text}")
 
     # Проверяем, доступна ли клавиатура личностей
     keyboard = Keyboards.get_personalities_keyboard()
@@ -49,204 +69,164 @@ async def handle_talk(message: Message):
         return
 
     # Отправляем изображение с текстом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["talk"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=keyboard
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'talk' не найдено")
-        await message.answer(
-            answer_text,
-            reply_markup=keyboard
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await message.answer(
-            answer_text,
-            reply_markup=keyboard
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=keyboard
-        )
+    await answer_photo_or_text(message, "talk", answer_text, reply_markup=keyboard)
 
 @talk_router.callback_query(F.data.startswith(CallbackData.TALK_PREFIX.value))
-async def handle_person(callback: CallbackQuery):
+async def handle_person(callback: CallbackQuery, state: FSMContext):
     """
     Обрабатывает выбор персонажа из клавиатуры.
 
     Действия:
     1. Извлекает выбранного персонажа из callback данных
-    2. Сохраняет промт персонажа в сессию пользователя
+    2. Сохраняет персонажа в данные FSM и устанавливает состояние диалога
     3. Отправляет изображение персонажа с текстом и клавиатурой
 
     Args:
         callback: Объект callback от нажатия кнопки выбора персонажа
+        state: Контекст состояния FSM
     """
+    await callback.answer()
     logger.debug(f"Получен callback: user={callback.from_user.id}, data={callback.data}")
 
     # Извлекаем person_id из callback_data (формат "talk_person_id")
-    try:
-        person_id = callback.data[len(CallbackData.TALK_PREFIX.value):]
-    except IndexError:
-        logger.error(f"Некорректный формат callback_data: {callback.data}")
-        await callback.message.answer("Ошибка при выборе персонажа. Попробуйте снова.")
-        await callback.answer()
-        return
+    person_id = callback.data.removeprefix(CallbackData.TALK_PREFIX.value)
 
     # Проверяем, существует ли персонаж
-    if person_id not in Config.PERSONS:
+    answer_text = _PERSON_GREETINGS.get(person_id)
+    if answer_text is None:
         logger.warning(f"Недопустимый персонаж: {person_id}")
         await callback.message.answer(
             "Этот персонаж недоступен. Выберите другого.",
             reply_markup=Keyboards.get_personalities_keyboard()
         )
-        await callback.answer()
         return
 
-    person_name = Config.PERSONS[person_id]
-
-    # Сохраняем промт персонажа в сессию пользователя
+    # Проверяем, что промт персонажа загружен
     try:
-        prompt = Config.get_prompts(f"talk_{person_id}")
-        Config.USER_SESSIONS[callback.from_user.id] = {"person": prompt, "person_id": person_id}
+        Config.get_prompts(f"talk_{person_id}")
     except (FileNotFoundError, IOError) as e:
         logger.error(f"Ошибка получения промта для {person_id}: {str(e)}")
         await callback.message.answer("Ошибка при загрузке персонажа. Попробуйте другого.")
-        await callback.answer()
         return
 
-    # Подготовка текста
-    answer_text = f"Вы говорите с {person_name.upper()}. Отправьте сообщение:"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для персонажа {person_id} обрезана до 1024 символов: {answer_text}")
+    # Персонаж и состояние записываются одновременно: сессия хранится в хранилище FSM
+    # (в том числе в Redis), а не в памяти процесса
+    await asyncio.gather(
+        state.set_data({"person_id": person_id}),
+        state.set_state(TalkState.chatting)
+    )
 
     # Отправляем изображение персонажа с текстом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS[person_id]
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={callback.from_user.id}")
-    except KeyError:
-        logger.warning(f"Изображение для персонажа {person_id} не найдено")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await callback.message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
-
-    # Подтверждаем обработку callback
-    await callback.answer()
-
-@talk_router.message(lambda message: message.from_user.id in Config.USER_SESSIONS)
-async def handle_talk_message(message: Message):
+    await answer_photo_or_text(
+        callback.message,
+        person_id,
+        answer_text,
+        reply_markup=Keyboards.get_talk_exit_keyboard()
+    )
+
+@talk_router.message(TalkState.chatting)
+async def handle_talk_message(message: Message, state: FSMContext):
     """
     Обрабатывает сообщения пользователя в режиме диалога с персонажем.
 
     Действия:
-    1. Формирует промт для ChatGPT (промт персонажа + сообщение пользователя)
-    2. Получает ответ от ChatGPT
-    3. Отправляет изображение персонажа с ответом и клавиатурой
+    1. Формирует запрос к ChatGPT (промт персонажа как системная инструкция + сообщение пользователя)
+    2. Получает ответ от ChatGPT, по мере генерации показывая его в подписи к изображению персонажа
+    3. Показывает полный ответ с клавиатурой
 
     Args:
         message: Входящее сообщение от пользователя в режиме диалога
+        state: Контекст состояния FSM
     """
     user_id = message.from_user.id
     logger.debug(f"Пользователь {user_id} отправил сообщение в диалоге: {message.text}")
 
-    # Проверяем, есть ли сессия
-    if user_id not in Config.USER_SESSIONS:
-        logger.warning(f"Сессия для пользователя {user_id} не найдена")
-        await message.answer("Сессия диалога не найдена. Начните новый диалог с /talk.")
+    # Пустые сообщения и сообщения без текста (стикеры, фото) не отправляются в ChatGPT
+    text = (message.text or "").strip()
+    if not text:
+        await message.answer("Пожалуйста, напишите сообщение.", reply_markup=Keyboards.get_talk_exit_keyboard())
+        return
+    if len(text) > MAX_TALK_MESSAGE_LENGTH:
+        await message.answer(
+            f"Сообщение слишком длинное: не более {MAX_TALK_MESSAGE_LENGTH} символов.",
+            reply_markup=Keyboards.get_talk_exit_keyboard()
+        )
         return
 
-    # Формируем промт: берем сохраненный промт персонажа и добавляем сообщение пользователя
-    prompt = Config.USER_SESSIONS[user_id]["person"] + "\n\n" + message.text
-    person_id = Config.USER_SESSIONS[user_id]["person_id"]
-
-    # Получаем ответ от ChatGPT
+    # Промт персонажа передается системной инструкцией, сообщение пользователя - отдельно
+    person_id = (await state.get_data()).get("person_id")
     try:
-        response = await get_chatgpt_response(prompt)
-    except Exception as e:
-        logger.error(f"Ошибка получения ответа от ChatGPT: {str(e)}")
-        await message.answer("Ошибка при получении ответа. Попробуйте снова.")
+        person_prompt = Config.get_prompts(f"talk_{person_id}")
+    except FileNotFoundError as e:
+        logger.error(f"Ошибка получения промта для {person_id}: {str(e)}")
+        await state.clear()
+        await message.answer(
+            "Персонаж недоступен. Выберите другого.",
+            reply_markup=Keyboards.get_personalities_keyboard()
+        )
         return
 
-    # Обрезаем подпись, если она слишком длинная
-    if len(response) > 1024:
-        response = response[:1020] + "..."
-        logger.warning(f"Ответ ChatGPT для user_id={user_id} обрезан до 1024 символов: {response}")
+    # Ответ из кэша отправляется сразу: заглушка и редактирование подписи не нужны
+    response = peek_cached_response(text, person_prompt)
+    image_path = Config.IMAGE_PATHS.get(person_id)
+    stream = None
+    if response is None and image_path is not None:
+        stream = CaptionStream(message, image_path)
+        # Изображение персонажа отправляется одновременно с запросом к ChatGPT
+        stream.start()
+
+    # Получаем ответ от ChatGPT
+    if response is None:
+        try:
+            # Перефразированные сообщения ищутся среди ответов того же персонажа
+            response = await get_cached_chatgpt_response(
+                text,
+                on_partial=stream.update if stream is not None else None,
+                namespace=f"talk_{person_id}",
+                system=person_prompt
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения ответа от ChatGPT: {str(e)}")
+            if stream is not None:
+                await stream.cancel()
+            await message.answer("Ошибка при получении ответа. Попробуйте снова.")
+            return
+
+    # Показываем полный ответ в уже отправленном изображении
+    if stream is not None:
+        try:
+            if await stream.finish(response, reply_markup=Keyboards.get_talk_exit_keyboard()):
+                return
+        except Exception as e:
+            logger.error(f"Ошибка вывода ответа в подпись: {str(e)}")
 
     # Отправляем изображение персонажа с ответом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS[person_id]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption=response,
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с ответом для user_id={user_id}")
-    except KeyError:
-        logger.warning(f"Изображение для персонажа {person_id} не найдено")
-        await message.answer(
-            response,
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await message.answer(
-            response,
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_talk_exit_keyboard()
-        )
+    await answer_photo_or_text(
+        message,
+        person_id,
+        response,
+        reply_markup=Keyboards.get_talk_exit_keyboard()
+    )
 
 @talk_router.callback_query(F.data == CallbackData.END_TALK.value)
-async def handle_talk_exit(callback: CallbackQuery):
+async def handle_talk_exit(callback: CallbackQuery, state: FSMContext):
     """
     Обрабатывает завершение диалога.
 
     Действия:
-    1. Удаляет сессию пользователя
+    1. Очищает состояние FSM
     2. Отправляет изображение с сообщением о завершении и главным меню
 
     Args:
         callback: Объект callback от нажатия кнопки "Закончить"
+        state: Контекст состояния FSM
     """
+    await callback.answer()
     user_id = callback.from_user.id
     logger.debug(f"Пользователь {user_id} завершил диалог")
 
-    # Удаляем сессию пользователя
-    Config.USER_SESSIONS.pop(user_id, None)
+    # Очищаем состояние диалога
+    await state.clear()
 
     # Отправляем изображение с текстом и главным меню
     try:
@@ -254,5 +234,3 @@ async def handle_talk_exit(callback: CallbackQuery):
         logger.debug(f"Выполнена callback_finality для user_id={callback.from_user.id}")
     except Exception as e:
         logger.error(f"Ошибка в callback_finality: {str(e)}")
-    # Подтверждаем обработку callback
-    await callback.answer()
\ No newline at end of file
@@ -8,15 +8,19 @@
 - Использование Finite State Machine (FSM) для управления состоянием
 - Предоставление клавиатуры для смены языка или завершения
 """
+import asyncio
 import logging
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from keybords import Keyboards, CallbackData
-from utils.chatgpt import get_chatgpt_response
+from utils.chatgpt import get_cached_chatgpt_response, peek_cached_response
 from config import Config
 from utils.callback_finality import callback_finality
+from utils.caption_stream import CaptionStream
+from utils.images import answer_photo_or_text
+from utils.keyword_filter import KeywordFilter
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -24,6 +28,13 @@ logger = logging.getLogger(__name__)
 # Создаем роутер для обработки сообщений, связанных с переводчиком
 trans_router = Router()
 
+# Максимальная длина текста для перевода: перевод показывается в подписи к изображению
+MAX_TRANSLATION_LENGTH = 1000
+
+# Отображаемые имена языков по коду из callback_data и их список для сообщений об ошибке
+_LANGUAGE_NAMES = {str(code): name for name, code in Config.LANGUAGES.items()}
+_LANGUAGES_LIST = ", ".join(Config.LANGUAGES)
+
 class TranslateState(StatesGroup):
     """
     Класс состояний Finite State Machine (FSM) для управления переводчиком.
@@ -35,7 +46,7 @@ class TranslateState(StatesGroup):
     selecting_language = State()
     translating = State()
 
-@trans_router.message(F.text.lower().contains("translate"))
+@trans_router.message(KeywordFilter("translate"))
 async def handle_translate(message: Message, state: FSMContext):
     """
     Обработчик команды запуска переводчика.
@@ -54,10 +65,6 @@ async def handle_translate(message: Message, state: FSMContext):
 
     # Подготовка текста
     answer_text = Config.get_messages('translate') or "Выберите язык для перевода:"
-    # Обрезаем подпись, если она слишком длинная
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для команды 'translate' обрезана до 1024 символов: {answer_text}")
 
     keyboard = Keyboards.get_languages_keyboard()
     if keyboard is None:
@@ -66,33 +73,12 @@ async def handle_translate(message: Message, state: FSMContext):
         return
 
     # Отправляем изображение с текстом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["translate"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=keyboard
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'translate' не найдено")
-        await message.answer(
-            answer_text,
-            reply_markup=keyboard
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await message.answer(
-            answer_text,
-            reply_markup=keyboard
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=keyboard
-        )
+    await answer_photo_or_text(
+        message,
+        "translate",
+        answer_text,
+        reply_markup=keyboard
+    )
 
     await state.set_state(TranslateState.selecting_language)
     logger.debug(f"Установлено состояние TranslateState.selecting_language для пользователя {message.from_user.id}")
@@ -111,78 +97,45 @@ async def handle_language(callback: CallbackQuery, state: FSMContext):
         2. Отправляет изображение с приглашением ввести текст
         3. Устанавливает состояние перевода
     """
+    await callback.answer()
     logger.debug(f"Callback data: {callback.data}")
-    language = callback.data[len(CallbackData.LANG_PREFIX.value):]
-    out_language = ''.join([key for key, value in Config.LANGUAGES.items() if str(value) == language])
-    available_languages = [str(lang) for lang in Config.LANGUAGES.values()]
-    logger.debug(f"Проверка языка: {language}, доступные языки: {available_languages}")
-    if language not in available_languages:
+    language = callback.data.removeprefix(CallbackData.LANG_PREFIX.value)
+    out_language = _LANGUAGE_NAMES.get(language)
+    logger.debug(f"Проверка языка: {language}, отображаемое имя: {out_language}")
+    if out_language is None:
         logger.warning(f"Недопустимый язык: {language}")
 
         # Подготовка текста для ошибки
-        answer_text = f"Язык {language} недоступен. Доступные языки: {', '.join(Config.LANGUAGES.keys())}."
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для ошибки языка обрезана до 1024 символов: {answer_text}")
-
-        try:
-            image_path = Config.IMAGE_PATHS["translate"]
-            photo = FSInputFile(path=image_path)
-            await callback.message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.get_languages_keyboard()
-            )
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await callback.message.answer(
-                answer_text,
-                reply_markup=Keyboards.get_languages_keyboard()
-            )
-        await callback.answer()
+        answer_text = f"Язык {language} недоступен. Доступные языки: {_LANGUAGES_LIST}."
+        await answer_photo_or_text(
+            callback.message,
+            "translate",
+            answer_text,
+            reply_markup=Keyboards.get_languages_keyboard(),
+            error_text=answer_text
+        )
         return
 
     logger.debug(f"Пользователь {callback.from_user.id} выбрал язык: {language}")
-    await state.update_data(selected_language=language)
 
     # Подготовка текста
     answer_text = f"Выбран язык: {out_language}. Отправьте текст для перевода:"
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для выбора языка обрезана до 1024 символов: {answer_text}")
 
     # Отправляем изображение с текстом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["translate"]
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={callback.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'translate' не найдено")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await callback.message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
-
-    await state.set_state(TranslateState.translating)
+    await answer_photo_or_text(
+        callback.message,
+        "translate",
+        answer_text,
+        reply_markup=Keyboards.get_translator_control_keyboard()
+    )
+
+    # Язык и состояние записываются одновременно; данные FSM режима перевода
+    # состоят только из языка, поэтому перезаписываются без предварительного чтения
+    await asyncio.gather(
+        state.set_data({"selected_language": language}),
+        state.set_state(TranslateState.translating)
+    )
     logger.debug(f"Установлено состояние TranslateState.translating для пользователя {callback.from_user.id}")
-    await callback.answer()
 
 @trans_router.callback_query(F.data == CallbackData.CHANGE_LANG.value)
 async def handle_change_language(callback: CallbackQuery, state: FSMContext):
@@ -197,46 +150,22 @@ async def handle_change_language(callback: CallbackQuery, state: FSMContext):
         1. Отправляет изображение с клавиатурой выбора языков
         2. Устанавливает состояние выбора языка
     """
+    await callback.answer()
     logger.debug(f"Пользователь {callback.from_user.id} запросил смену языка")
 
     # Подготовка текста
     answer_text = "Выберите язык для перевода:"
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для смены языка обрезана до 1024 символов: {answer_text}")
 
     # Отправляем изображение с текстом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["translate"]
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=Keyboards.get_languages_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={callback.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'translate' не найдено")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_languages_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await callback.message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_languages_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await callback.message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_languages_keyboard()
-        )
+    await answer_photo_or_text(
+        callback.message,
+        "translate",
+        answer_text,
+        reply_markup=Keyboards.get_languages_keyboard()
+    )
 
     await state.set_state(TranslateState.selecting_language)
     logger.debug(f"Установлено состояние TranslateState.selecting_language для пользователя {callback.from_user.id}")
-    await callback.answer()
 
 @trans_router.message(TranslateState.translating)
 async def handle_translation(message: Message, state: FSMContext):
@@ -249,9 +178,24 @@ async def handle_translation(message: Message, state: FSMContext):
 
     Действия:
         1. Получает выбранный язык из состояния
-        2. Отправляет запрос на перевод к ChatGPT
-        3. Отправляет изображение с переведенным текстом
+        2. Отправляет запрос на перевод к ChatGPT, по мере генерации показывая перевод в подписи к изображению
+        3. Показывает полный перевод с клавиатурой
     """
+    # Пустой или слишком длинный текст не отправляется в ChatGPT
+    text = (message.text or "").strip()
+    if not text:
+        await message.answer(
+            "Пожалуйста, отправьте текст для перевода.",
+            reply_markup=Keyboards.get_translator_control_keyboard()
+        )
+        return
+    if len(text) > MAX_TRANSLATION_LENGTH:
+        await message.answer(
+            f"Текст слишком длинный: можно перевести не более {MAX_TRANSLATION_LENGTH} символов за раз.",
+            reply_markup=Keyboards.get_translator_control_keyboard()
+        )
+        return
+
     user_data = await state.get_data()
     language = user_data.get('selected_language')
     if not language:
@@ -259,92 +203,72 @@ async def handle_translation(message: Message, state: FSMContext):
 
         # Подготовка текста
         answer_text = "Язык не выбран. Пожалуйста, выберите язык с помощью /translate."
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для ошибки языка обрезана до 1024 символов: {answer_text}")
-
-        try:
-            image_path = Config.IMAGE_PATHS["translate"]
-            photo = FSInputFile(path=image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.get_languages_keyboard()
-            )
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await message.answer(
-                answer_text,
-                reply_markup=Keyboards.get_languages_keyboard()
-            )
+        await answer_photo_or_text(
+            message,
+            "translate",
+            answer_text,
+            reply_markup=Keyboards.get_languages_keyboard(),
+            error_text=answer_text
+        )
         await state.set_state(TranslateState.selecting_language)
         return
 
     logger.debug(f"Пользователь {message.from_user.id} отправил текст для перевода на {language}: {message.text}")
-    prompt = f"Переведи следующий текст на {language}:\n\n{message.text}"
-    try:
-        translation = await get_chatgpt_response(prompt)
-        logger.debug(f"Получен перевод: {translation}")
-    except Exception as e:
-        logger.error(f"Ошибка получения перевода: {str(e)}")
-
-        # Подготовка текста
-        answer_text = "Не удалось выполнить перевод. Попробуйте снова."
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для ошибки перевода обрезана до 1024 символов: {answer_text}")
-
+    # Инструкция одинакова для всех запросов на этот язык и передается системным сообщением
+    instruction = f"Переведи текст сообщения пользователя на {language}. В ответе приведи только перевод."
+    header = f"Перевод ({_LANGUAGE_NAMES.get(language, '')}):\n\n"
+    # Перевод из кэша отправляется сразу: заглушка и редактирование подписи не нужны
+    translation = peek_cached_response(text, instruction)
+    stream = None
+    if translation is None and "translate" in Config.IMAGE_PATHS:
+        stream = CaptionStream(message, Config.IMAGE_PATHS["translate"])
+        # Изображение отправляется одновременно с запросом к ChatGPT
+        stream.start(header + "…")
+
+    if translation is None:
         try:
-            image_path = Config.IMAGE_PATHS["translate"]
-            photo = FSInputFile(path=image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.get_translator_control_keyboard()
+            # Только точный кэш: близкий по смыслу текст не означает тот же перевод
+            translation = await get_cached_chatgpt_response(
+                text,
+                on_partial=(lambda text: stream.update(header + text)) if stream is not None else None,
+                namespace=None,
+                system=instruction
             )
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await message.answer(
+            logger.debug(f"Получен перевод: {translation}")
+        except Exception as e:
+            logger.error(f"Ошибка получения перевода: {str(e)}")
+            if stream is not None:
+                await stream.cancel()
+
+            # Подготовка текста
+            answer_text = "Не удалось выполнить перевод. Попробуйте снова."
+            await answer_photo_or_text(
+                message,
+                "translate",
                 answer_text,
-                reply_markup=Keyboards.get_translator_control_keyboard()
+                reply_markup=Keyboards.get_translator_control_keyboard(),
+                error_text=answer_text
             )
-        return
+            return
 
     # Подготовка текста
-    out_language = ''.join([key for key, value in Config.LANGUAGES.items() if str(value) == language])
-    answer_text = f"Перевод ({out_language}):\n\n{translation}"
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для перевода обрезана до 1024 символов: {answer_text}")
+    answer_text = header + translation
+
+    # Показываем полный перевод в уже отправленном изображении
+    if stream is not None:
+        try:
+            if await stream.finish(answer_text, reply_markup=Keyboards.get_translator_control_keyboard()):
+                return
+        except Exception as e:
+            logger.error(f"Ошибка вывода перевода в подпись: {str(e)}")
 
     # Отправляем изображение с переводом и клавиатурой
-    try:
-        image_path = Config.IMAGE_PATHS["translate"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption=answer_text,
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
-        logger.debug(f"Отправлено изображение {image_path} с переводом для user_id={message.from_user.id}")
-    except KeyError:
-        logger.warning("Изображение для команды 'translate' не найдено")
-        await message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
-    except FileNotFoundError:
-        logger.error(f"Файл изображения {image_path} не найден")
-        await message.answer(
-            answer_text,
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Ошибка отправки изображения: {str(e)}")
-        await message.answer(
-            "Произошла ошибка. Попробуйте снова.",
-            reply_markup=Keyboards.get_translator_control_keyboard()
-        )
+    await answer_photo_or_text(
+        message,
+        "translate",
+        answer_text,
+        reply_markup=Keyboards.get_translator_control_keyboard()
+    )
 
 @trans_router.callback_query(F.data == CallbackData.END_TRANS.value)
 async def return_to_main_menu(callback: CallbackQuery, state: FSMContext):
@@ -356,6 +280,7 @@ async def return_to_main_menu(callback: CallbackQuery, state: FSMContext):
         2. Отправляет изображение с сообщением о завершении
         3. Показывает главное меню
     """
+    await callback.answer()
     logger.debug(f"Пользователь {callback.from_user.id} завершил работу с переводчиком")
 
     try:
@@ -367,4 +292,3 @@ async def return_to_main_menu(callback: CallbackQuery, state: FSMContext):
     # Отправляем изображение с текстом и главным меню
 
     await state.clear()
-    await callback.answer()
\ No newline at end of file
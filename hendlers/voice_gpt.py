@@ -9,13 +9,17 @@
 - Повторные попытки при ошибках API
 """
 import logging
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+import random
+import time
+from typing import Optional, Dict, Tuple
+from datetime import timedelta
 from aiogram import Router, F
-from aiogram.types import Message, Voice, CallbackQuery, FSInputFile
+from aiogram.types import Message, Voice, CallbackQuery
+from aiogram.enums import ChatAction
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.exceptions import TelegramAPIError
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramServerError
+from openai import APIConnectionError, InternalServerError, RateLimitError
 from keybords import Keyboards, CallbackData
 from utils.voice import voice_to_text, text_to_voice
 from utils.chatgpt import get_chatgpt_response
@@ -23,6 +27,8 @@ from config import Config
 from functools import wraps
 import asyncio
 from utils.callback_finality import callback_finality
+from utils.images import answer_cached_photo, answer_photo_or_text
+from utils.keyword_filter import KeywordFilter
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -33,7 +39,19 @@ voice_router = Router()
 # Константы
 MAX_VOICE_DURATION = 30  # Максимальная длительность голосового сообщения (секунды)
 RETRY_ATTEMPTS = 3  # Количество повторных попыток
-RETRY_DELAY = 1  # Задержка между попытками (секунды)
+RETRY_DELAY = 1  # Начальная задержка между попытками (секунды), удваивается с каждой попыткой
+
+# Временные ошибки, после которых имеет смысл повторить запрос.
+# TelegramRetryAfter (429) не повторяется здесь: паузу и повтор выполняет
+# OutgoingRateLimitMiddleware сессии бота.
+RETRIABLE_ERRORS = (
+    asyncio.TimeoutError,
+    TelegramNetworkError,
+    TelegramServerError,
+    APIConnectionError,
+    RateLimitError,
+    InternalServerError,
+)
 
 class VoiceState(StatesGroup):
     """
@@ -46,10 +64,13 @@ class VoiceState(StatesGroup):
 
 class RateLimiter:
     """
-    Класс для ограничения количества запросов от пользователей.
+    Класс для ограничения количества запросов от пользователей (token bucket).
+
+    Каждому пользователю доступно max_requests запросов, запас которых
+    равномерно восстанавливается за period.
 
     Атрибуты:
-        user_limits: Словарь с данными о лимитах пользователей
+        user_limits: Словарь {user_id: (доступные запросы, время последнего запроса)}
         max_requests: Максимальное количество запросов в период
         period: Период времени для ограничения
     """
@@ -61,10 +82,12 @@ class RateLimiter:
             max_requests: Максимальное количество запросов
             period: Период времени для ограничения
         """
-        self.user_limits: Dict[int, dict] = {}
+        self.user_limits: Dict[int, Tuple[float, float]] = {}
         self.max_requests = max_requests
         self.period = period
-        logger.debug(f"RateLimiter инициализирован: max_requests={max_requests}, period={period}")
+        self._period_seconds = period.total_seconds()
+        self._last_cleanup = time.monotonic()
+        logger.debug("RateLimiter инициализирован: max_requests=%s, period=%s", max_requests, period)
 
     def check_limit(self, user_id: int) -> bool:
         """
@@ -76,45 +99,37 @@ class RateLimiter:
         Returns:
             bool: True если лимит не превышен, False если превышен
         """
-        now = datetime.now()
-        logger.debug(f"Проверка лимита для user_id={user_id}")
-
-        if user_id not in self.user_limits:
-            self.user_limits[user_id] = {
-                'count': 1,
-                'last_request': now
-            }
-            logger.debug(f"Новая запись для user_id={user_id}: count=1, last_request={now}")
-            return True
-
-        user_data = self.user_limits[user_id]
-
-        if now - user_data['last_request'] > self.period:
-            user_data['count'] = 1
-            user_data['last_request'] = now
-            logger.debug(f"Сброс лимита для user_id={user_id}: count=1, last_request={now}")
-            return True
-
-        if user_data['count'] >= self.max_requests:
-            logger.warning(f"Превышен лимит для user_id={user_id}: count={user_data['count']}")
+        now = time.monotonic()
+        tokens, last_ts = self.user_limits.get(user_id, (self.max_requests, now))
+
+        # Восстанавливаем запас запросов пропорционально прошедшему времени
+        tokens = min(self.max_requests, tokens + (now - last_ts) * self.max_requests / self._period_seconds)
+        if tokens < 1:
+            self.user_limits[user_id] = (tokens, now)
+            logger.warning(f"Превышен лимит для user_id={user_id}")
             return False
 
-        user_data['count'] += 1
-        logger.debug(f"Обновление для user_id={user_id}: count={user_data['count']}")
+        self.user_limits[user_id] = (tokens - 1, now)
         return True
 
     def cleanup(self):
         """
         Удаляет устаревшие записи из user_limits.
+
+        Выполняется не чаще одного раза за period: за это время запас запросов
+        любого пользователя полностью восстанавливается, и запись можно удалить.
         """
-        now = datetime.now()
+        now = time.monotonic()
+        if now - self._last_cleanup < self._period_seconds:
+            return
+        self._last_cleanup = now
         expired_users = [
-            user_id for user_id, data in self.user_limits.items()
-            if now - data['last_request'] > self.period
+            user_id for user_id, (_, last_ts) in self.user_limits.items()
+            if now - last_ts > self._period_seconds
         ]
         for user_id in expired_users:
-            logger.debug(f"Удаление устаревшей записи для user_id={user_id}")
             del self.user_limits[user_id]
+        logger.debug("Удалено %s устаревших записей лимитов", len(expired_users))
 
     def decorator(self, func):
         """
@@ -122,34 +137,22 @@ class RateLimiter:
         """
         @wraps(func)
         async def wrapper(message: Message, *args, **kwargs):
-            self.cleanup()  # Очистка перед проверкой
+            self.cleanup()  # Очистка устаревших записей (не чаще раза за период)
             if not self.check_limit(message.from_user.id):
                 logger.warning(f"Превышен лимит запросов для user_id={message.from_user.id}")
 
                 # Подготовка текста
                 answer_text = (
                     f"Слишком много запросов. Максимум {self.max_requests} за "
-                    f"{int(self.period.total_seconds() // 60)} минут. Попробуйте позже."
+                    f"{int(self._period_seconds // 60)} минут. Попробуйте позже."
+                )
+                await answer_photo_or_text(
+                    message,
+                    "main",
+                    answer_text,
+                    reply_markup=Keyboards.main_menu(),
+                    error_text=answer_text
                 )
-                if len(answer_text) > 1024:
-                    answer_text = answer_text[:1020] + "..."
-                    logger.warning(f"Подпись для лимита запросов обрезана до 1024 символов: {answer_text}")
-
-                try:
-                    image_path = Config.IMAGE_PATHS["main"]
-                    photo = FSInputFile(path=image_path)
-                    await message.answer_photo(
-                        photo=photo,
-                        caption=answer_text,
-                        reply_markup=Keyboards.main_menu()
-                    )
-                    logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-                except (KeyError, FileNotFoundError, Exception) as e:
-                    logger.error(f"Ошибка отправки изображения: {str(e)}")
-                    await message.answer(
-                        answer_text,
-                        reply_markup=Keyboards.main_menu()
-                    )
                 return
             return await func(message, *args, **kwargs)
         return wrapper
@@ -165,12 +168,17 @@ async def retry_on_failure(
         **kwargs
 ) -> Optional[any]:
     """
-    Выполняет функцию с повторными попытками при ошибках.
+    Выполняет функцию с повторными попытками при временных ошибках.
+
+    Повтор выполняется только для RETRIABLE_ERRORS (в том числе обернутых через
+    raise ... from); остальные ошибки пробрасываются сразу. Задержка растет
+    экспоненциально со случайным разбросом, чтобы повторы разных пользователей
+    не приходили одновременно.
 
     Args:
         func: Выполняемая функция
         attempts: Количество попыток
-        delay: Задержка между попытками
+        delay: Начальная задержка между попытками
         *args: Аргументы функции
         **kwargs: Именованные аргументы
 
@@ -178,27 +186,42 @@ async def retry_on_failure(
         Результат функции или None при ошибке
 
     Raises:
-        Последнее исключение после исчерпания попыток
+        Неповторяемое исключение или последнее исключение после исчерпания попыток
     """
     last_exception = None
     for attempt in range(attempts):
         try:
-            logger.debug(f"Попытка {attempt + 1}/{attempts} для функции {func.__name__}")
+            logger.debug("Попытка %s/%s для функции %s", attempt + 1, attempts, func.__name__)
             result = await func(*args, **kwargs)
-            logger.debug(f"Успешное выполнение {func.__name__}")
+            logger.debug("Успешное выполнение %s", func.__name__)
             return result
         except Exception as e:
-            logger.error(f"Ошибка в {func.__name__} (попытка {attempt + 1}): {str(e)}")
+            logger.error("Ошибка в %s (попытка %s): %s", func.__name__, attempt + 1, e)
+            if not isinstance(e, RETRIABLE_ERRORS) and not isinstance(e.__cause__, RETRIABLE_ERRORS):
+                raise
             last_exception = e
             if attempt < attempts - 1:
-                await asyncio.sleep(delay)
+                await asyncio.sleep(delay * (2 ** attempt) * random.uniform(0.5, 1.5))
 
     if last_exception:
-        logger.error(f"Исчерпаны попытки для {func.__name__}: {str(last_exception)}")
+        logger.error("Исчерпаны попытки для %s: %s", func.__name__, last_exception)
         raise last_exception
     return None
 
-@voice_router.message(F.text.lower().contains("voice"))
+async def _send_chat_action(message: Message, action: ChatAction) -> None:
+    """
+    Показывает действие бота в чате сообщения; ошибка отправки только логируется.
+
+    Args:
+        message: Сообщение, в чат которого отправляется действие
+        action: Действие бота (например, ChatAction.RECORD_VOICE)
+    """
+    try:
+        await message.bot.send_chat_action(message.chat.id, action)
+    except TelegramAPIError as e:
+        logger.warning(f"Не удалось отправить действие {action}: {str(e)}")
+
+@voice_router.message(KeywordFilter("voice"))
 @rate_limiter.decorator
 async def handle_voice_command(message: Message, state: FSMContext) -> None:
     """
@@ -208,24 +231,21 @@ async def handle_voice_command(message: Message, state: FSMContext) -> None:
         message: Объект сообщения от пользователя
         state: Контекст состояния FSM
     """
-    logger.debug(f"Пользователь {message.from_user.id} запустил голосовой интерфейс")
+    logger.debug("Пользователь %s запустил голосовой интерфейс", message.from_user.id)
 
     # Подготовка текста
     answer_text = "Отправьте голосовое сообщение, и я отвечу вам голосом!"
-    if len(answer_text) > 1024:
-        answer_text = answer_text[:1020] + "..."
-        logger.warning(f"Подпись для команды 'voice' обрезана до 1024 символов: {answer_text}")
 
     # Отправляем изображение с текстом и клавиатурой
     try:
         image_path = Config.IMAGE_PATHS["voice_gpt"]
-        photo = FSInputFile(path=image_path)
-        await message.answer_photo(
-            photo=photo,
+        await answer_cached_photo(
+            message,
+            image_path,
             caption=answer_text,
             reply_markup=Keyboards.get_voice_control_keyboard()
         )
-        logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
+        logger.debug("Отправлено изображение %s с подписью для user_id=%s", image_path, message.from_user.id)
     except KeyError:
         logger.warning("Изображение для команды 'voice_gpt' не найдено")
         await message.answer(
@@ -241,28 +261,17 @@ async def handle_voice_command(message: Message, state: FSMContext) -> None:
     except Exception as e:
         logger.error(f"Ошибка обработки команды /voice: {str(e)}")
         answer_text = "Ошибка обработки команды. Попробуйте позже."
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для ошибки команды обрезана до 1024 символов: {answer_text}")
-        try:
-            image_path = Config.IMAGE_PATHS["main"]
-            photo = FSInputFile(path=image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.main_menu()
-            )
-            logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await message.answer(
-                answer_text,
-                reply_markup=Keyboards.main_menu()
-            )
+        await answer_photo_or_text(
+            message,
+            "main",
+            answer_text,
+            reply_markup=Keyboards.main_menu(),
+            error_text=answer_text
+        )
         return
 
     await state.set_state(VoiceState.waiting_for_voice)
-    logger.debug(f"Установлено состояние VoiceState.waiting_for_voice для user_id={message.from_user.id}")
+    logger.debug("Установлено состояние VoiceState.waiting_for_voice для user_id=%s", message.from_user.id)
 
 @voice_router.message(VoiceState.waiting_for_voice, F.voice)
 @rate_limiter.decorator
@@ -275,7 +284,7 @@ async def handle_voice_message(message: Message, state: FSMContext) -> None:
         message: Объект сообщения с голосом
         state: Контекст состояния FSM
     """
-    logger.debug(f"Пользователь {message.from_user.id} отправил голосовое сообщение")
+    logger.debug("Пользователь %s отправил голосовое сообщение", message.from_user.id)
     try:
         voice = message.voice
 
@@ -283,24 +292,13 @@ async def handle_voice_message(message: Message, state: FSMContext) -> None:
         if voice.duration > MAX_VOICE_DURATION:
             logger.warning(f"Голосовое сообщение слишком длинное: {voice.duration} сек")
             answer_text = f"Сообщение слишком длинное (максимум {MAX_VOICE_DURATION} сек)."
-            if len(answer_text) > 1024:
-                answer_text = answer_text[:1020] + "..."
-                logger.warning(f"Подпись для длинного сообщения обрезана до 1024 символов: {answer_text}")
-            try:
-                image_path = Config.IMAGE_PATHS["voice_gpt"]
-                photo = FSInputFile(path=image_path)
-                await message.answer_photo(
-                    photo=photo,
-                    caption=answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
-                logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-            except (KeyError, FileNotFoundError, Exception) as e:
-                logger.error(f"Ошибка отправки изображения: {str(e)}")
-                await message.answer(
-                    answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
+            await answer_photo_or_text(
+                message,
+                "voice_gpt",
+                answer_text,
+                reply_markup=Keyboards.get_voice_control_keyboard(),
+                error_text=answer_text
+            )
             return
 
         # Получение и обработка голосового сообщения
@@ -311,24 +309,13 @@ async def handle_voice_message(message: Message, state: FSMContext) -> None:
         if not voice_file:
             logger.error("Не удалось получить файл голосового сообщения")
             answer_text = "Не удалось обработать голосовое сообщение. Попробуйте снова."
-            if len(answer_text) > 1024:
-                answer_text = answer_text[:1020] + "..."
-                logger.warning(f"Подпись для ошибки файла обрезана до 1024 символов: {answer_text}")
-            try:
-                image_path = Config.IMAGE_PATHS["voice_gpt"]
-                photo = FSInputFile(path=image_path)
-                await message.answer_photo(
-                    photo=photo,
-                    caption=answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
-                logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-            except (KeyError, FileNotFoundError, Exception) as e:
-                logger.error(f"Ошибка отправки изображения: {str(e)}")
-                await message.answer(
-                    answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
+            await answer_photo_or_text(
+                message,
+                "voice_gpt",
+                answer_text,
+                reply_markup=Keyboards.get_voice_control_keyboard(),
+                error_text=answer_text
+            )
             return
 
         text = await retry_on_failure(
@@ -339,76 +326,52 @@ async def handle_voice_message(message: Message, state: FSMContext) -> None:
         if not text:
             logger.warning("Не удалось распознать речь в голосовом сообщении")
             answer_text = "Не удалось распознать речь. Попробуйте говорить четче."
-            if len(answer_text) > 1024:
-                answer_text = answer_text[:1020] + "..."
-                logger.warning(f"Подпись для ошибки распознавания обрезана до 1024 символов: {answer_text}")
-            try:
-                image_path = Config.IMAGE_PATHS["voice_gpt"]
-                photo = FSInputFile(path=image_path)
-                await message.answer_photo(
-                    photo=photo,
-                    caption=answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
-                logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-            except (KeyError, FileNotFoundError, Exception) as e:
-                logger.error(f"Ошибка отправки изображения: {str(e)}")
-                await message.answer(
-                    answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
+            await answer_photo_or_text(
+                message,
+                "voice_gpt",
+                answer_text,
+                reply_markup=Keyboards.get_voice_control_keyboard(),
+                error_text=answer_text
+            )
             return
 
-        logger.debug(f"Распознанный текст: {text}")
+        logger.debug("Распознанный текст: %s", text)
         answer_text = f"Вы сказали: {text}"
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для распознанного текста обрезана до 1024 символов: {answer_text}")
-        try:
-            image_path = Config.IMAGE_PATHS["voice_gpt"]
-            photo = FSInputFile(path=image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.get_voice_control_keyboard()
-            )
-            logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await message.answer(
-                answer_text,
-                reply_markup=Keyboards.get_voice_control_keyboard()
-            )
+
+        # Распознанный текст отправляется одновременно с запросом к ChatGPT
+        ack_task = asyncio.create_task(answer_photo_or_text(
+            message,
+            "voice_gpt",
+            answer_text,
+            reply_markup=Keyboards.get_voice_control_keyboard(),
+            error_text=answer_text
+        ))
 
         # Получение ответа от ChatGPT
-        response = await retry_on_failure(get_chatgpt_response, text)
+        try:
+            response = await retry_on_failure(get_chatgpt_response, text)
+        finally:
+            # Распознанный текст должен прийти раньше ответа
+            await ack_task
         if not response:
             logger.error("Не удалось получить ответ от ChatGPT")
             answer_text = "Ошибка получения ответа. Попробуйте снова."
-            if len(answer_text) > 1024:
-                answer_text = answer_text[:1020] + "..."
-                logger.warning(f"Подпись для ошибки ChatGPT обрезана до 1024 символов: {answer_text}")
-            try:
-                image_path = Config.IMAGE_PATHS["voice_gpt"]
-                photo = FSInputFile(path=image_path)
-                await message.answer_photo(
-                    photo=photo,
-                    caption=answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
-                logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-            except (KeyError, FileNotFoundError, Exception) as e:
-                logger.error(f"Ошибка отправки изображения: {str(e)}")
-                await message.answer(
-                    answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
+            await answer_photo_or_text(
+                message,
+                "voice_gpt",
+                answer_text,
+                reply_markup=Keyboards.get_voice_control_keyboard(),
+                error_text=answer_text
+            )
             return
 
-        logger.debug(f"Ответ от ChatGPT: {response}")
+        logger.debug("Ответ от ChatGPT: %s", response)
 
-        # Преобразование и отправка ответа
-        voice_response = await retry_on_failure(text_to_voice, response)
+        # Преобразование ответа в речь; пока оно идет, пользователь видит "записывает аудио"
+        _, voice_response = await asyncio.gather(
+            _send_chat_action(message, ChatAction.RECORD_VOICE),
+            retry_on_failure(text_to_voice, response)
+        )
         if voice_response:
             logger.debug("Голосовой ответ успешно сгенерирован")
             await message.answer_voice(
@@ -418,88 +381,44 @@ async def handle_voice_message(message: Message, state: FSMContext) -> None:
         else:
             logger.error("Не удалось сгенерировать голосовой ответ")
             answer_text = f"Ошибка генерации голосового ответа. Вот текстовый ответ:\n\n{response}"
-            if len(answer_text) > 1024:
-                answer_text = answer_text[:1020] + "..."
-                logger.warning(f"Подпись для текстового ответа обрезана до 1024 символов: {answer_text}")
-            try:
-                image_path = Config.IMAGE_PATHS["voice_gpt"]
-                photo = FSInputFile(path=image_path)
-                await message.answer_photo(
-                    photo=photo,
-                    caption=answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
-                logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-            except (KeyError, FileNotFoundError, Exception) as e:
-                logger.error(f"Ошибка отправки изображения: {str(e)}")
-                await message.answer(
-                    answer_text,
-                    reply_markup=Keyboards.get_voice_control_keyboard()
-                )
+            await answer_photo_or_text(
+                message,
+                "voice_gpt",
+                answer_text,
+                reply_markup=Keyboards.get_voice_control_keyboard(),
+                error_text=answer_text
+            )
 
     except ValueError as e:
         logger.warning(f"Ошибка значения: {str(e)}")
         answer_text = str(e)
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для ошибки значения обрезана до 1024 символов: {answer_text}")
-        try:
-            image_path = Config.IMAGE_PATHS["voice_gpt"]
-            photo = FSInputFile(path=image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.get_voice_control_keyboard()
-            )
-            logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await message.answer(
-                answer_text,
-                reply_markup=Keyboards.get_voice_control_keyboard()
-            )
+        await answer_photo_or_text(
+            message,
+            "voice_gpt",
+            answer_text,
+            reply_markup=Keyboards.get_voice_control_keyboard(),
+            error_text=answer_text
+        )
     except TelegramAPIError as e:
         logger.warning(f"Ошибка Telegram API: {str(e)}")
         answer_text = "Слишком много запросов. Подождите немного."
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для ошибки API обрезана до 1024 символов: {answer_text}")
-        try:
-            image_path = Config.IMAGE_PATHS["main"]
-            photo = FSInputFile(path=image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.main_menu()
-            )
-            logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await message.answer(
-                answer_text,
-                reply_markup=Keyboards.main_menu()
-            )
+        await answer_photo_or_text(
+            message,
+            "main",
+            answer_text,
+            reply_markup=Keyboards.main_menu(),
+            error_text=answer_text
+        )
     except Exception as e:
         logger.error(f"Необработанная ошибка в handle_voice_message: {str(e)}")
         answer_text = "Произошла ошибка. Попробуйте позже."
-        if len(answer_text) > 1024:
-            answer_text = answer_text[:1020] + "..."
-            logger.warning(f"Подпись для необработанной ошибки обрезана до 1024 символов: {answer_text}")
-        try:
-            image_path = Config.IMAGE_PATHS["voice_gpt"]
-            photo = FSInputFile(path=image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption=answer_text,
-                reply_markup=Keyboards.get_voice_control_keyboard()
-            )
-            logger.debug(f"Отправлено изображение {image_path} с подписью для user_id={message.from_user.id}")
-        except (KeyError, FileNotFoundError, Exception) as e:
-            logger.error(f"Ошибка отправки изображения: {str(e)}")
-            await message.answer(
-                answer_text,
-                reply_markup=Keyboards.get_voice_control_keyboard()
-            )
+        await answer_photo_or_text(
+            message,
+            "voice_gpt",
+            answer_text,
+            reply_markup=Keyboards.get_voice_control_keyboard(),
+            error_text=answer_text
+        )
 
 @voice_router.callback_query(F.data == CallbackData.END_VOICE.value)
 async def return_to_main_menu(callback: CallbackQuery, state: FSMContext):
@@ -510,23 +429,24 @@ async def return_to_main_menu(callback: CallbackQuery, state: FSMContext):
         callback: Объект callback-запроса от кнопки
         state: Контекст состояния FSM
     """
-    logger.debug(f"Пользователь {callback.from_user.id} вернулся в главное меню")
+    await callback.answer()
+    logger.debug("Пользователь %s вернулся в главное меню", callback.from_user.id)
 
     # Подготовка текста
     try:
         await callback_finality(callback)
-        logger.debug(f"Выполнена callback_finality для user_id={callback.from_user.id}")
+        logger.debug("Выполнена callback_finality для user_id=%s", callback.from_user.id)
     except Exception as e:
         logger.error(f"Ошибка в callback_finality: {str(e)}")
 
     await state.clear()
-    await callback.answer()
 
 @voice_router.callback_query()
 async def catch_all_callbacks(callback: CallbackQuery, state: FSMContext):
     """
     Универсальный хендлер для необработанных callback-запросов.
     """
+    await callback.answer()
     current_state = await state.get_state()
     logger.warning(
         f"Необработанный callback в voice_gpt: user={callback.from_user.id}, "
@@ -536,10 +456,9 @@ async def catch_all_callbacks(callback: CallbackQuery, state: FSMContext):
     # Отправляем изображение с текстом и главным меню
     try:
         await callback_finality(callback)
-        logger.debug(f"Выполнена callback_finality для user_id={callback.from_user.id}")
+        logger.debug("Выполнена callback_finality для user_id=%s", callback.from_user.id)
     except Exception as e:
         logger.error(f"Ошибка в callback_finality: {str(e)}")
 
     await state.clear()
-    logger.debug(f"Сброшено состояние для user_id={callback.from_user.id}")
-    await callback.answer()
\ No newline at end of file
+    logger.debug("Сброшено состояние для user_id=%s", callback.from_user.id)
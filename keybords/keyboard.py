@@ -1,5 +1,6 @@
 import logging
 from enum import Enum
+from functools import lru_cache
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
@@ -30,6 +31,8 @@ class Keyboards:
     Класс для создания inline и reply-клавиатур Telegram-бота.
 
     Все методы возвращают готовые объекты клавиатур для использования в обработчиках.
+    Клавиатуры статичны, поэтому каждая строится один раз и переиспользуется
+    (lru_cache по аргументам). Возвращаемые объекты нельзя изменять в обработчиках.
     """
 
     # Тексты кнопок для повторного использования
@@ -50,6 +53,7 @@ class Keyboards:
         )
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def main_menu(columns: int = 2) -> ReplyKeyboardMarkup:
         """
         Создает главное меню бота с основными командами.
@@ -76,6 +80,7 @@ class Keyboards:
         return builder.as_markup(resize_keyboard=True)
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_random_fact_keyboard() -> InlineKeyboardMarkup:
         """
         Создает inline-клавиатуру для режима случайных фактов.
@@ -93,6 +98,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_gpt_exit_keyboard() -> InlineKeyboardMarkup:
         """
         Создает inline-клавиатуру для выхода из режима GPT.
@@ -106,6 +112,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_personalities_keyboard(columns: int = 1) -> InlineKeyboardMarkup | None:
         """
         Создает inline-клавиатуру с выбором личностей для диалога.
@@ -136,6 +143,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_talk_exit_keyboard() -> InlineKeyboardMarkup:
         """
         Создает inline-клавиатуру для выхода из режима диалога.
@@ -149,6 +157,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_quiz_topics_keyboard(columns: int = 1) -> InlineKeyboardMarkup:
         """
         Создает inline-клавиатуру с выбором тем для квиза.
@@ -173,6 +182,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_quiz_control_keyboard(columns: int = 1) -> InlineKeyboardMarkup:
         """
         Создает inline-клавиатуру для управления квизом после ответа.
@@ -198,6 +208,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_languages_keyboard(columns: int = 2) -> InlineKeyboardMarkup | None:
         """
         Создает inline-клавиатуру с выбором языков для перевода.
@@ -226,6 +237,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_translator_control_keyboard(columns: int = 1) -> InlineKeyboardMarkup:
         """
         Создает inline-клавиатуру для управления переводчиком.
@@ -247,6 +259,7 @@ class Keyboards:
         return builder.as_markup()
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_voice_control_keyboard() -> InlineKeyboardMarkup:
         builder = InlineKeyboardBuilder()
         builder.button(
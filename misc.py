@@ -1,28 +1,107 @@
+import logging
 from datetime import datetime
+from logging.handlers import MemoryHandler, QueueHandler
+from aiogram.types import ErrorEvent
 from app import logger
+from config import Config
+from keybords import Keyboards
+from utils.chatgpt import close_gpt_client
+from utils.images import load_image_file_ids, preload_images, save_image_file_ids
 
-def on_start(bot):
+async def on_start(bot):
     """
     Функция, вызываемая при запуске бота.
 
-    Выводит в консоль текущие дату и время начала работы бота.
+    Выводит в консоль текущие дату и время начала работы бота,
+    загружает сохраненный кэш file_id изображений и предзагружает
+    изображения, которые еще не загружены в Telegram.
     Используется как обработчик события startup в aiogram.
     """
     logger.info(f"Бот запущен, ID: {bot.id}")
+    load_image_file_ids()
+    await preload_images()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Config.IMAGE_PATHS: %s, Config.get_messages('main'): %s", Config.IMAGE_PATHS, Config.get_messages('main'))
     # Получаем текущее время и форматируем его в строку
     now = datetime.now().strftime('%H:%M:%S %d/%m/%Y')
     # Выводим сообщение о запуске бота
     print(f'Bot started at {now}')
 
 
-def on_shutdown():
+async def on_shutdown():
     """
     Функция, вызываемая при остановке бота.
 
-    Выводит в консоль текущие дату и время остановки бота.
+    Выводит в консоль текущие дату и время остановки бота,
+    сохраняет кэш file_id изображений, закрывает соединения с OpenAI
+    и останавливает слушатель логов.
     Используется как обработчик события shutdown в aiogram.
     """
     # Получаем текущее время и форматируем его в строку
     now = datetime.now().strftime('%H:%M:%S %d/%m/%Y')
     # Выводим сообщение об остановке бота
-    print(f'Bot is down at {now}')
\ No newline at end of file
+    print(f'Bot is down at {now}')
+    save_image_file_ids()
+    await close_gpt_client()
+    stop_log_listener()
+
+
+async def on_error(event: ErrorEvent) -> bool:
+    """
+    Общий обработчик ошибок, возникших в обработчиках апдейтов.
+
+    Логирует исключение с трассировкой и отправляет пользователю сообщение
+    об ошибке с главным меню. Используется как обработчик события errors в aiogram.
+    """
+    logger.error("Ошибка обработки апдейта %s: %s", event.update.update_id, event.exception,
+                 exc_info=event.exception)
+    update = event.update
+    message = update.message or (update.callback_query.message if update.callback_query else None)
+    if message is not None:
+        try:
+            await message.answer(
+                "Произошла ошибка. Попробуйте позже.",
+                reply_markup=Keyboards.main_menu()
+            )
+        except Exception as e:
+            logger.error("Не удалось отправить сообщение об ошибке: %s", e)
+    if update.callback_query:
+        # Обработчики подтверждают callback первым действием, поэтому здесь
+        # подтверждение нужно только при ошибке до него и обычно отклоняется Telegram
+        try:
+            await update.callback_query.answer()
+        except Exception as e:
+            logger.debug("Callback не подтвержден повторно: %s", e)
+    return True
+
+
+def stop_log_listener():
+    """
+    Останавливает QueueListener, настроенный в app.setup_logging.
+
+    Дописывает накопленные в очереди записи и подключает конечные обработчики
+    напрямую к корневому логгеру, чтобы сообщения после остановки не терялись.
+    Буферы файлового лога сбрасываются на диск. Повторный вызов ничего не делает.
+    """
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        listener = getattr(handler, 'listener', None)
+        if isinstance(handler, QueueHandler) and listener is not None:
+            listener.stop()
+            root_logger.removeHandler(handler)
+            for target in listener.handlers:
+                root_logger.addHandler(target)
+    flush_log_buffers()
+
+
+def flush_log_buffers():
+    """
+    Сбрасывает на диск буферы MemoryHandler, настроенные в app.setup_logging.
+    """
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers:
+        listener = getattr(handler, 'listener', None)
+        targets = listener.handlers if listener is not None else (handler,)
+        for target in targets:
+            if isinstance(target, MemoryHandler):
+                target.flush()
\ No newline at end of file
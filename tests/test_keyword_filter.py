@@ -0,0 +1,46 @@
+"""
+Проверка фильтра сообщений по ключевым словам меню (utils/keyword_filter.py).
+
+Запуск: python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.keyword_filter import MENU_KEYWORDS, KeywordFilter, classify  # noqa: E402
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_menu_buttons(self):
+        buttons = {
+            "🎲 /random - Случайный факт": "random",
+            "👤 /talk - Диалог с личностью": "talk",
+            "🧩 /quiz - Квиз": "quiz",
+            "🌐 /translate - Переводчик": "translate",
+            "🎙️ /voice - Голосовой чат": "voice",
+        }
+        for text, keyword in buttons.items():
+            with self.subTest(text=text):
+                self.assertEqual(classify(text), frozenset((keyword,)))
+
+    def test_case_insensitive(self):
+        self.assertEqual(classify("QUIZ please"), frozenset(("quiz",)))
+
+    def test_several_keywords(self):
+        self.assertEqual(classify("talk or quiz"), frozenset(("talk", "quiz")))
+
+    def test_no_keywords(self):
+        for text in ("", "привет", "/gpt - ChatGPT интерфейс"):
+            with self.subTest(text=text):
+                self.assertEqual(classify(text), frozenset())
+
+    def test_unknown_keyword_is_rejected(self):
+        self.assertNotIn("gpt", MENU_KEYWORDS)
+        with self.assertRaises(ValueError):
+            KeywordFilter("gpt")
+
+
+if __name__ == "__main__":
+    unittest.main()
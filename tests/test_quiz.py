@@ -0,0 +1,159 @@
+"""
+Проверка обработчиков квиза через Dispatcher.feed_update.
+
+Запросы к Telegram перехватываются FakeSession, ответы ChatGPT подменяются.
+Запуск: python -m unittest discover -s tests
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+os.environ.setdefault("GPT_TOKEN", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import misc  # noqa: E402,F401 - misc импортируется раньше app
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.fsm.context import FSMContext  # noqa: E402
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from aiogram.methods import AnswerCallbackQuery, EditMessageMedia  # noqa: E402
+from aiogram.types import Message, Update  # noqa: E402
+
+from config import Config  # noqa: E402
+from hendlers import all_handlers  # noqa: E402
+from hendlers.quiz import QuizData, QuizStates, _save_quiz  # noqa: E402
+
+BOT_ID = 42
+CHAT_ID = USER_ID = 1
+
+
+class FakeSession(BaseSession):
+    """Сессия, которая записывает запросы к Telegram вместо их отправки."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests.append(method)
+        if method.__returning__ is Message:
+            return Message.model_validate({
+                "message_id": len(self.requests) + 100,
+                "date": datetime.now(),
+                "chat": {"id": CHAT_ID, "type": "private"},
+                "photo": [{"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}],
+                "caption": getattr(method, "caption", None),
+            })
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def _callback_update(data: str) -> Update:
+    return Update.model_validate({
+        "update_id": 1,
+        "callback_query": {
+            "id": "cb",
+            "chat_instance": "ci",
+            "data": data,
+            "from": {"id": USER_ID, "is_bot": False, "first_name": "Test"},
+            "message": {
+                "message_id": 10,
+                "date": datetime.now(),
+                "chat": {"id": CHAT_ID, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Bot"},
+                "photo": [{"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}],
+            },
+        },
+    })
+
+
+def _sticker_update() -> Update:
+    return Update.model_validate({
+        "update_id": 2,
+        "message": {
+            "message_id": 11,
+            "date": datetime.now(),
+            "chat": {"id": CHAT_ID, "type": "private"},
+            "from": {"id": USER_ID, "is_bot": False, "first_name": "Test"},
+            "sticker": {
+                "file_id": "sticker", "file_unique_id": "sticker", "type": "regular",
+                "width": 1, "height": 1, "is_animated": False, "is_video": False,
+            },
+        },
+    })
+
+
+class QuizCallbackTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.session = FakeSession()
+        self.bot = Bot(f"{BOT_ID}:TEST", session=self.session)
+        self.storage = MemoryStorage()
+        self.dp = Dispatcher(storage=self.storage)
+        self.dp.include_router(all_handlers)
+        self.key = StorageKey(bot_id=BOT_ID, chat_id=CHAT_ID, user_id=USER_ID)
+
+    async def asyncTearDown(self):
+        self.dp.sub_routers.clear()
+        all_handlers._parent_router = None
+
+    async def test_topic_selection(self):
+        with patch("hendlers.quiz.get_quiz_questions", AsyncMock(return_value=["Вопрос 1", "Вопрос 2"])):
+            await self.dp.feed_update(self.bot, _callback_update("quiz_prog"))
+
+        self.assertEqual(await self.storage.get_state(self.key), QuizStates.answering_question.state)
+        self.assertTrue(any(isinstance(m, AnswerCallbackQuery) for m in self.session.requests))
+
+    async def test_end_quiz_clears_state(self):
+        state = FSMContext(self.storage, self.key)
+        await state.set_state(QuizStates.waiting_for_action)
+        await _save_quiz(state, QuizData(topic="prog", score=3))
+
+        # file_id известен: раньше это приводило к editMessageMedia с reply-клавиатурой
+        with patch.dict(Config.IMAGE_FILE_IDS, {Config.IMAGE_PATHS["main"]: "photo"}):
+            await self.dp.feed_update(self.bot, _callback_update("end_quiz"))
+        await asyncio.sleep(0)  # Подтверждение callback отправляется в фоне
+
+        self.assertIsNone(await self.storage.get_state(self.key))
+        self.assertFalse(any(isinstance(m, EditMessageMedia) for m in self.session.requests))
+        self.assertTrue(any(isinstance(m, AnswerCallbackQuery) for m in self.session.requests))
+
+    async def test_non_text_answer_is_not_checked(self):
+        state = FSMContext(self.storage, self.key)
+        await state.set_state(QuizStates.answering_question)
+        await _save_quiz(state, QuizData(topic="prog", question="Вопрос", questions=["Следующий"]))
+
+        with patch("hendlers.quiz.check_answer", AsyncMock()) as check_answer:
+            await self.dp.feed_update(self.bot, _sticker_update())
+
+        check_answer.assert_not_awaited()
+        self.assertEqual(await self.storage.get_state(self.key), QuizStates.answering_question.state)
+
+
+class QuizPrefetchTest(unittest.IsolatedAsyncioTestCase):
+    async def test_abandoned_prefetch_is_evicted(self):
+        from hendlers import quiz
+
+        with patch("hendlers.quiz.get_quiz_questions", AsyncMock(return_value=["Вопрос"])):
+            quiz._prefetch_questions(USER_ID, "prog", "Предыдущий вопрос")
+            await asyncio.sleep(0)
+        self.assertIn(USER_ID, quiz._prefetched_questions)
+
+        # Пользователь бросил квиз: по истечении времени жизни запись удаляется
+        expired = quiz._prefetched_questions.ttl + 1
+        with patch("utils.session_store.monotonic", return_value=time.monotonic() + expired):
+            self.assertEqual(len(quiz._prefetched_questions), 0)
+            self.assertNotIn(USER_ID, quiz._prefetched_questions)
+
+
+if __name__ == "__main__":
+    unittest.main()
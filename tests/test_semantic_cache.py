@@ -0,0 +1,50 @@
+"""
+Проверка семантического кэша ответов (utils/semantic_cache.py).
+
+Запуск: python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.semantic_cache import SemanticCache  # noqa: E402
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def test_similar_query_hits(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], "ответ")
+
+        # Длина вектора не важна: сравнивается только направление
+        self.assertEqual(cache.search([2.0, 0.1]), "ответ")
+
+    def test_below_threshold_misses(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], "ответ")
+
+        # Косинусное сходство ~0.71
+        self.assertIsNone(cache.search([1.0, 1.0]))
+
+    def test_best_match_wins(self):
+        cache = SemanticCache(threshold=0.5)
+        cache.add([1.0, 0.5], "дальний")
+        cache.add([1.0, 0.1], "ближний")
+
+        self.assertEqual(cache.search([1.0, 0.0]), "ближний")
+
+    def test_oldest_entry_is_evicted_at_maxsize(self):
+        cache = SemanticCache(maxsize=2, threshold=0.99)
+        cache.add([1.0, 0.0], "первый")
+        cache.add([0.0, 1.0], "второй")
+        cache.add([-1.0, 0.0], "третий")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.search([1.0, 0.0]))
+        self.assertEqual(cache.search([0.0, 1.0]), "второй")
+        self.assertEqual(cache.search([-1.0, 0.0]), "третий")
+
+
+if __name__ == "__main__":
+    unittest.main()
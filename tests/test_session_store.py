@@ -0,0 +1,71 @@
+"""
+Проверка ограниченного хранилища сессий (utils/session_store.py).
+
+Запуск: python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.session_store import SessionStore  # noqa: E402
+
+
+class FakeClock:
+    """Подменяет time.monotonic в utils.session_store управляемым временем."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch("utils.session_store.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entry_expires_after_ttl(self):
+        store = SessionStore(ttl=10)
+        store["a"] = 1
+        self.clock.now += 9
+        self.assertEqual(store.get("a"), 1)
+
+        self.clock.now += 11
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(len(store), 0)
+
+    def test_read_extends_ttl(self):
+        store = SessionStore(ttl=10)
+        store["a"] = 1
+        for _ in range(3):
+            self.clock.now += 8
+            self.assertEqual(store.get("a"), 1)
+
+    def test_fixed_expiry_without_sliding(self):
+        store = SessionStore(ttl=10, sliding=False)
+        store["a"] = 1
+        self.clock.now += 8
+        self.assertEqual(store.get("a"), 1)
+
+        # Чтение не продлевает время жизни: запись истекает через ttl после записи
+        self.clock.now += 3
+        self.assertIsNone(store.get("a"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        store = SessionStore(maxsize=2)
+        store["a"] = 1
+        store["b"] = 2
+        store.get("a")  # "b" становится давно неиспользуемой записью
+        store["c"] = 3
+
+        self.assertEqual(sorted(store), ["a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Проверка объединения одновременных запросов (utils.chatgpt._single_flight).
+
+Запуск: python -m unittest discover -s tests
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+os.environ.setdefault("GPT_TOKEN", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chatgpt import _inflight, _single_flight  # noqa: E402
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def _request(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return "ответ"
+
+    async def test_concurrent_callers_share_one_call(self):
+        waiters = [asyncio.create_task(_single_flight("key", self._request)) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertEqual(await asyncio.gather(*waiters), ["ответ"] * 3)
+        self.assertEqual(self.calls, 1)
+        self.assertNotIn("key", _inflight)
+
+    async def test_cancelled_waiter_does_not_cancel_request(self):
+        first = asyncio.create_task(_single_flight("key", self._request))
+        second = asyncio.create_task(_single_flight("key", self._request))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertEqual(await second, "ответ")
+        self.assertTrue(first.cancelled())
+        self.assertEqual(self.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Проверка ограничения частоты исходящих запросов (utils/telegram_limiter.py).
+
+Запуск: python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+from time import monotonic
+from unittest.mock import AsyncMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.methods import AnswerCallbackQuery, SendChatAction, SendMessage  # noqa: E402
+
+from utils.telegram_limiter import OutgoingRateLimitMiddleware, TokenBucket  # noqa: E402
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        self.assertLess(monotonic() - started, 0.02)  # Всплеск в пределах capacity без ожидания
+
+        await bucket.acquire()
+        self.assertGreaterEqual(monotonic() - started, 0.04)  # Следующий токен через ~1/rate
+
+
+class OutgoingRateLimitMiddlewareTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.middleware = OutgoingRateLimitMiddleware()
+        self.make_request = AsyncMock(return_value=True)
+
+    async def test_messages_use_chat_bucket(self):
+        await self.middleware(self.make_request, None, SendMessage(chat_id=1, text="текст"))
+
+        self.make_request.assert_awaited_once()
+        self.assertIn(1, self.middleware._chat_buckets)
+
+    async def test_service_methods_bypass_limits(self):
+        await self.middleware(self.make_request, None, SendChatAction(chat_id=1, action="record_voice"))
+        await self.middleware(self.make_request, None, AnswerCallbackQuery(callback_query_id="cb"))
+
+        self.assertEqual(self.make_request.await_count, 2)
+        self.assertNotIn(1, self.middleware._chat_buckets)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,8 @@
 import logging
 
-from aiogram.types import FSInputFile
-
 from config import Config
 from keybords import Keyboards
+from utils.images import answer_cached_photo
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -14,9 +13,9 @@ async def callback_finality(callback):
     answer_text = Config.get_messages('main')
     image_path = Config.IMAGE_PATHS['main']
     try:
-        photo = FSInputFile(path=image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_cached_photo(
+            callback.message,
+            image_path,
             caption=answer_text,
             reply_markup=Keyboards.main_menu()
         )
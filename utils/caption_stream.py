@@ -0,0 +1,155 @@
+"""
+Модуль постепенного вывода ответа ChatGPT в подпись к изображению.
+
+Основные функции:
+- Отправка изображения с заглушкой до ответа или с первой частью ответа
+- Редактирование подписи по мере поступления текста не чаще одного раза за интервал
+- Ожидание при ограничении частоты запросов Telegram (TelegramRetryAfter)
+- Финальное редактирование подписи с клавиатурой
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from utils.images import answer_cached_photo, truncate_caption
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+class CaptionStream:
+    """
+    Выводит растущий текст ответа в подпись к изображению.
+
+    Текст передается методом update() без ожидания; отправку и редактирование
+    выполняет фоновая задача, поэтому получение токенов не ждет запросов к Telegram.
+
+    Атрибуты:
+        message: Сообщение, в чат которого отправляется изображение
+        image_path: Путь к файлу изображения
+        edit_interval: Минимальный интервал между редактированиями (секунды)
+        min_delta: Минимальный прирост текста (символы) для промежуточного редактирования
+    """
+    def __init__(self, message: Message, image_path: str, edit_interval: float = 0.8, min_delta: int = 24):
+        """
+        Инициализирует CaptionStream.
+
+        Args:
+            message: Сообщение, в чат которого отправляется изображение
+            image_path: Путь к файлу изображения
+            edit_interval: Минимальный интервал между редактированиями (секунды)
+            min_delta: Минимальный прирост текста (символы) для промежуточного редактирования
+        """
+        self.message = message
+        self.image_path = image_path
+        self.edit_interval = edit_interval
+        self.min_delta = min_delta
+        self._text = ""
+        self._shown = ""
+        self._sent: Optional[Message] = None
+        self._ready = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, placeholder: str = "…") -> None:
+        """
+        Отправляет изображение с заглушкой, не дожидаясь первой части ответа.
+
+        Отправка выполняется параллельно с запросом к ChatGPT; ответ, полученный
+        раньше отправки, сразу заменит заглушку.
+
+        Args:
+            placeholder: Подпись до получения ответа
+        """
+        self.update(placeholder)
+
+    def update(self, text: str) -> None:
+        """
+        Передает текущий накопленный текст ответа.
+
+        Args:
+            text: Весь полученный на данный момент текст
+        """
+        self._text = text
+        self._changed.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Отправляет изображение и редактирует подпись по мере поступления текста."""
+        try:
+            self._shown = truncate_caption(self._text)
+            self._sent = await answer_cached_photo(self.message, self.image_path, caption=self._shown)
+        except Exception as e:
+            logger.warning("Не удалось отправить изображение для потокового ответа: %s", e)
+            return
+        finally:
+            self._ready.set()
+
+        try:
+            while True:
+                await asyncio.sleep(self.edit_interval)
+                await self._changed.wait()
+                self._changed.clear()
+                text = truncate_caption(self._text)
+                if len(text) - len(self._shown) < self.min_delta:
+                    continue
+                await self._edit(text)
+        except Exception as e:
+            # Промежуточные редактирования необязательны: полный ответ покажет finish()
+            logger.warning("Ошибка редактирования подписи: %s", e)
+
+    async def _edit(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        """
+        Редактирует подпись отправленного изображения.
+
+        Args:
+            text: Новая подпись
+            reply_markup: Клавиатура (опционально)
+        """
+        while True:
+            try:
+                await self._sent.edit_caption(caption=text, reply_markup=reply_markup)
+                self._shown = text
+                return
+            except TelegramRetryAfter as e:
+                logger.debug("Ограничение частоты редактирования, ожидание %s с", e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                # Например, "message is not modified"
+                logger.debug("Подпись не изменена: %s", e)
+                return
+
+    async def finish(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> bool:
+        """
+        Завершает вывод: показывает полный ответ и клавиатуру.
+
+        Args:
+            text: Полный текст ответа
+            reply_markup: Клавиатура для итогового сообщения (опционально)
+
+        Returns:
+            True, если ответ показан; False, если изображение не было отправлено
+            и ответ нужно отправить обычным способом
+        """
+        if self._task is None:
+            return False
+        # Дожидаемся отправки изображения, затем останавливаем промежуточные редактирования
+        await self._ready.wait()
+        await self.cancel()
+        if self._sent is None:
+            return False
+        await self._edit(truncate_caption(text), reply_markup)
+        return True
+
+    async def cancel(self) -> None:
+        """Останавливает фоновую задачу вывода."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -4,21 +4,157 @@
 Основные функции:
 - Асинхронное получение ответов от ChatGPT (GPT-4o-mini)
 - Поддержка прокси-соединений
+- Общий клиент OpenAI с пулом соединений для всех запросов
 - Обработка ошибок API
+- Потоковое получение ответа по мере генерации
+- Кэширование ответов на повторяющиеся вопросы
+- Объединение одинаковых одновременных запросов в один вызов API
+- Заранее полученные ответы для неизменных промптов (случайный факт, первые вопросы темы)
+- Получение вопросов квиза пакетом за один запрос
 """
+import asyncio
+import hashlib
+import importlib.util
+import json
 import logging
 import openai
 import httpx
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 from config import Config
+from utils.session_store import SessionStore
+from utils.semantic_cache import SemanticCache
+from utils.response_pool import ResponsePool
 
 logger = logging.getLogger(__name__)
 
-async def get_chatgpt_response(prompt: str) -> str:
+# Модель ChatGPT для всех запросов
+GPT_MODEL = "gpt-4o-mini"
+# Модель и размерность эмбеддингов для семантического кэша
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 256
+
+# Параметры пула HTTP-соединений с API OpenAI
+HTTP_TIMEOUT = 30
+HTTP_MAX_CONNECTIONS = 200
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 100
+
+# Количество вопросов квиза, запрашиваемых за один вызов API
+QUIZ_BATCH_SIZE = 10
+
+# Общий клиент OpenAI, создается при первом запросе
+_gpt_client: Optional[openai.AsyncOpenAI] = None
+
+# Кэш ответов ChatGPT: {ключ запроса: ответ}; ответ истекает через GPT_CACHE_TTL после записи
+_response_cache = SessionStore(maxsize=Config.GPT_CACHE_SIZE, ttl=Config.GPT_CACHE_TTL, sliding=False)
+# Семантические кэши для перефразированных вопросов: {пространство имен: кэш}.
+# Ответы разных режимов (/gpt, разные персонажи) не подменяют друг друга
+_semantic_caches: Dict[str, SemanticCache] = {}
+# Пул заранее полученных ответов на неизменные промпты
+_response_pool = ResponsePool(
+    lambda prompt: get_chatgpt_response(prompt),
+    size=Config.GPT_POOL_SIZE,
+    ttl=Config.GPT_CACHE_TTL
+)
+# Пул заранее полученных пакетов первых вопросов квиза (ответы в формате JSON)
+_quiz_pool = ResponsePool(
+    lambda prompt: get_chatgpt_response(prompt, response_format={"type": "json_object"}),
+    size=Config.GPT_POOL_SIZE,
+    ttl=Config.GPT_CACHE_TTL
+)
+# Выполняющиеся запросы к API: {ключ запроса: задача}
+_inflight: Dict[Hashable, asyncio.Task] = {}
+
+async def _single_flight(key: Hashable, request: Callable[[], Awaitable[str]]) -> str:
+    """
+    Выполняет запрос к API один раз для всех одновременных вызовов с одинаковым ключом.
+
+    Первый вызов запускает задачу, остальные ожидают ее результат (или исключение).
+    Отмена одного из ожидающих не отменяет запрос для остальных.
+
+    Args:
+        key: Ключ запроса
+        request: Функция, создающая корутину запроса
+
+    Returns:
+        Результат запроса
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(request())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.debug("Ожидание выполняющегося запроса: '%s'", key)
+    return await asyncio.shield(task)
+
+def get_gpt_client() -> openai.AsyncOpenAI:
+    """
+    Возвращает общий асинхронный клиент OpenAI.
+
+    Соединения с API переиспользуются между запросами, поэтому TCP- и TLS-рукопожатие
+    выполняется один раз, а не при каждом вызове. HTTP/2 включается,
+    если установлен пакет h2 (pip install httpx[http2]).
+
+    Returns:
+        Клиент OpenAI
+    """
+    global _gpt_client
+    if _gpt_client is None:
+        _gpt_client = openai.AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(
+                proxy=Config.PROXY,
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+                ),
+            ),
+        )
+    return _gpt_client
+
+async def close_gpt_client() -> None:
+    """
+    Останавливает фоновые запросы и закрывает общий клиент OpenAI
+    и его соединения (вызывается при остановке бота).
+    """
+    global _gpt_client
+    _response_pool.cancel()
+    _quiz_pool.cancel()
+    if _gpt_client is not None:
+        await _gpt_client.close()
+        _gpt_client = None
+
+def _build_messages(prompt: str, system: Optional[str] = None) -> List[dict]:
+    """
+    Формирует список сообщений для запроса к ChatGPT.
+
+    Постоянная инструкция (например, промпт персонажа) передается отдельным
+    системным сообщением в начале: одинаковый префикс запросов кэшируется
+    на стороне OpenAI, что снижает стоимость и задержку ответа.
+
+    Args:
+        prompt: Текст запроса пользователя
+        system: Системная инструкция (опционально)
+
+    Returns:
+        Список сообщений в формате API
+    """
+    messages = [{'role': 'user', 'content': prompt}]
+    if system is not None:
+        messages.insert(0, {'role': 'system', 'content': system})
+    return messages
+
+async def get_chatgpt_response(prompt: str, response_format: Optional[dict] = None,
+                               system: Optional[str] = None) -> str:
     """
     Получает ответ от ChatGPT по заданному промту.
 
     Args:
         prompt: Текст запроса для ChatGPT
+        response_format: Формат ответа модели, например {"type": "json_object"} (опционально)
+        system: Системная инструкция, общая для многих запросов (опционально)
 
     Returns:
         Ответ от модели
@@ -28,23 +164,13 @@ async def get_chatgpt_response(prompt: str) -> str:
     """
     logger.debug(f"Отправка промта в ChatGPT: '{prompt}'")
     try:
-        # Инициализация асинхронного клиента OpenAI с прокси
-        gpt_client = openai.AsyncOpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            http_client=httpx.AsyncClient(
-                proxy=Config.PROXY,
-            ),
-        )
+        gpt_client = get_gpt_client()
 
         # Отправка запроса к API ChatGPT
         response = await gpt_client.chat.completions.create(
-            messages=[
-                {
-                    'role': 'user',
-                    'content': prompt,
-                }
-            ],
-            model="gpt-4o-mini",
+            messages=_build_messages(prompt, system),
+            model=GPT_MODEL,
+            response_format=response_format if response_format is not None else openai.NOT_GIVEN,
         )
 
         # Возвращаем текст первого ответа
@@ -56,21 +182,242 @@ async def get_chatgpt_response(prompt: str) -> str:
         logger.error(f"Ошибка API ChatGPT: {str(e)}")
         raise
 
-async def get_quiz_question(topic: str, previous_question: str = None) -> str:
+async def stream_chatgpt_response(prompt: str, system: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Получает ответ от ChatGPT по частям по мере генерации.
+
+    Args:
+        prompt: Текст запроса для ChatGPT
+        system: Системная инструкция, общая для многих запросов (опционально)
+
+    Yields:
+        Очередной фрагмент текста ответа
+
+    Raises:
+        Exception: Если произошла ошибка API
+    """
+    logger.debug(f"Отправка промта в ChatGPT (поток): '{prompt}'")
+    gpt_client = get_gpt_client()
+    try:
+        stream = await gpt_client.chat.completions.create(
+            messages=_build_messages(prompt, system),
+            model=GPT_MODEL,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error(f"Ошибка API ChatGPT: {str(e)}")
+        raise
+
+async def _complete(prompt: str, on_partial: Optional[Callable[[str], None]] = None,
+                    system: Optional[str] = None) -> str:
     """
-    Получает вопрос для квиза по заданной теме, исключая предыдущий вопрос.
+    Получает полный ответ от ChatGPT, при необходимости сообщая промежуточный текст.
+
+    Args:
+        prompt: Текст запроса для ChatGPT
+        on_partial: Функция, получающая весь накопленный текст после каждого фрагмента (опционально)
+        system: Системная инструкция (опционально)
+
+    Returns:
+        Ответ от модели
+    """
+    if on_partial is None:
+        return await get_chatgpt_response(prompt, system=system)
+    text = ""
+    async for delta in stream_chatgpt_response(prompt, system):
+        text += delta
+        on_partial(text)
+    logger.debug(f"Получен ответ от ChatGPT: '{text}'")
+    return text
+
+async def get_pooled_chatgpt_response(prompt: str) -> str:
+    """
+    Получает новый ответ от ChatGPT на неизменный промпт, по возможности из пула.
+
+    Подходит для запросов, которые должны давать разные ответы (например, случайные
+    факты): каждый ответ выдается один раз, а следующий запрашивается заранее.
+    Пул отключается переменной окружения GPT_POOL_SIZE=0.
+
+    Args:
+        prompt: Текст запроса для ChatGPT
+
+    Returns:
+        Ответ от модели
+
+    Raises:
+        Exception: Если пул пуст и произошла ошибка API
+    """
+    return await _response_pool.get(prompt)
+
+async def get_embedding(text: str) -> list:
+    """
+    Получает эмбеддинг текста от OpenAI.
+
+    Args:
+        text: Текст для векторизации
+
+    Returns:
+        Вектор эмбеддинга
+
+    Raises:
+        Exception: Если произошла ошибка API
+    """
+    gpt_client = get_gpt_client()
+    response = await gpt_client.embeddings.create(
+        input=text,
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
+    )
+    return response.data[0].embedding
+
+def _cache_key(prompt: str, system: Optional[str] = None) -> str:
+    """
+    Формирует ключ кэша по нормализованному тексту запроса, системной инструкции и имени модели.
+
+    Нормализация: нижний регистр и схлопывание пробельных символов.
+    """
+    normalized = " ".join(prompt.lower().split())
+    return hashlib.blake2b(f"{GPT_MODEL}\n{system or ''}\n{normalized}".encode("utf-8"), digest_size=16).hexdigest()
+
+def _get_semantic_cache(namespace: str) -> SemanticCache:
+    """Возвращает семантический кэш пространства имен, создавая его при первом обращении."""
+    cache = _semantic_caches.get(namespace)
+    if cache is None:
+        cache = _semantic_caches[namespace] = SemanticCache(
+            maxsize=Config.GPT_SEMANTIC_CACHE_SIZE,
+            threshold=Config.GPT_SEMANTIC_CACHE_THRESHOLD
+        )
+    return cache
+
+def peek_cached_response(prompt: str, system: Optional[str] = None) -> Optional[str]:
+    """
+    Возвращает ответ из точного кэша без обращения к API.
+
+    Позволяет обработчикам не отправлять изображение-заглушку для потокового
+    вывода, если ответ уже известен.
+
+    Args:
+        prompt: Текст запроса для ChatGPT
+        system: Системная инструкция (опционально)
+
+    Returns:
+        Ответ из кэша или None, если его нет (или кэш отключен)
+    """
+    if not Config.GPT_CACHE_ENABLED:
+        return None
+    return _response_cache.get(_cache_key(prompt, system))
+
+async def get_cached_chatgpt_response(
+        prompt: str,
+        on_partial: Optional[Callable[[str], None]] = None,
+        namespace: Optional[str] = "gpt",
+        system: Optional[str] = None
+) -> str:
+    """
+    Получает ответ от ChatGPT, используя кэш ответов на одинаковые запросы.
+
+    Подходит только для одиночных вопросов пользователя: запросы, которые должны
+    давать разные ответы (например, случайные факты), кэшировать нельзя.
+    Кэш отключается переменной окружения GPT_CACHE_ENABLED=false.
+
+    При GPT_SEMANTIC_CACHE_ENABLED=true после промаха точного кэша ответ ищется
+    по близости эмбеддингов в кэше пространства имен namespace, чтобы
+    перефразированные вопросы не отправлялись в API. Эмбеддинг вычисляется
+    только для текста пользователя, без системной инструкции. Ошибка получения
+    эмбеддинга не прерывает запрос: ответ берется от API.
+    Одинаковые запросы, пришедшие до получения ответа, ожидают один вызов API.
+
+    Если передан on_partial, ответ от API запрашивается потоком и накопленный текст
+    передается в on_partial по мере генерации. Ответы из кэша возвращаются сразу,
+    без вызова on_partial.
+
+    Args:
+        prompt: Текст запроса для ChatGPT
+        on_partial: Функция, получающая весь накопленный текст ответа (опционально)
+        namespace: Пространство имен семантического кэша (None - только точный кэш)
+        system: Системная инструкция, общая для многих запросов (опционально)
+
+    Returns:
+        Ответ от модели (из кэша или от API)
+
+    Raises:
+        Exception: Если произошла ошибка API
+    """
+    if not Config.GPT_CACHE_ENABLED:
+        return await _complete(prompt, on_partial, system)
+
+    key = _cache_key(prompt, system)
+    cached = _response_cache.get(key)
+    if cached is not None:
+        logger.debug("Ответ ChatGPT найден в кэше: '%s'", key)
+        return cached
+
+    return await _single_flight(key, lambda: _fetch_and_cache(prompt, key, on_partial, namespace, system))
+
+async def _fetch_and_cache(
+        prompt: str,
+        key: str,
+        on_partial: Optional[Callable[[str], None]] = None,
+        namespace: Optional[str] = None,
+        system: Optional[str] = None
+) -> str:
+    """
+    Получает ответ из семантического кэша или от API и сохраняет его в кэши.
+
+    Args:
+        prompt: Текст запроса для ChatGPT
+        key: Ключ кэша запроса
+        on_partial: Функция, получающая накопленный текст ответа API (опционально)
+        namespace: Пространство имен семантического кэша (None - только точный кэш)
+        system: Системная инструкция (опционально)
+
+    Returns:
+        Ответ от модели
+    """
+    embedding = None
+    if Config.GPT_SEMANTIC_CACHE_ENABLED and namespace is not None:
+        semantic_cache = _get_semantic_cache(namespace)
+        try:
+            embedding = await get_embedding(prompt)
+        except Exception as e:
+            logger.warning("Не удалось получить эмбеддинг запроса: %s", e)
+        if embedding is not None:
+            # Линейный поиск занимает десятки миллисекунд: выполняется вне цикла событий
+            cached = await asyncio.to_thread(semantic_cache.search, embedding)
+            if cached is not None:
+                logger.debug("Ответ ChatGPT найден в семантическом кэше: '%s'", key)
+                _response_cache[key] = cached
+                return cached
+
+    result = await _complete(prompt, on_partial, system)
+    _response_cache[key] = result
+    if embedding is not None:
+        semantic_cache.add(embedding, result)
+    return result
+
+async def get_quiz_questions(topic: str, previous_question: Optional[str] = None,
+                             count: int = QUIZ_BATCH_SIZE) -> List[str]:
+    """
+    Получает пакет вопросов для квиза по заданной теме одним запросом к API.
+
+    Модель отвечает в формате JSON {"questions": ["...", ...]}. Первый пакет темы
+    берется из пула заранее полученных пакетов.
 
     Args:
         topic: Тема квиза (например, 'prog', 'math', 'biology')
         previous_question: Предыдущий вопрос, чтобы избежать повтора (опционально)
+        count: Количество вопросов в пакете
 
     Returns:
-        Текст вопроса
+        Список текстов вопросов (не пустой)
 
     Raises:
-        ValueError: Если тема недопустима
+        ValueError: Если тема недопустима или модель не вернула ни одного вопроса
     """
-    logger.debug(f"Получение вопроса для темы '{topic}', исключая: '{previous_question}'")
+    logger.debug("Получение %s вопросов для темы '%s', исключая: '%s'", count, topic, previous_question)
     topics_map = {
         "prog": "программирования на языке Python",
         "math": "математических теорий (алгоритмы, теория множеств, матанализ)",
@@ -78,47 +425,84 @@ async def get_quiz_question(topic: str, previous_question: str = None) -> str:
     }
 
     if topic not in topics_map:
-        logger.error(f"Недопустимая тема: '{topic}'. Допустимые темы: {list(topics_map.keys())}")
+        logger.error("Недопустимая тема: '%s'. Допустимые темы: %s", topic, list(topics_map.keys()))
         raise ValueError(f"Недопустимая тема: '{topic}'")
 
-    if topic == "quiz_more":
-        prompt = (f"Сгенерируй новый вопрос на ту же тему, что и предыдущий вопрос: '{previous_question}'. "
-                  f"Ответ должен быть коротким - несколько слов.")
-    else:
-        prompt = (f"Сгенерируй вопрос для квиза на тему {topics_map[topic]}. "
-                  f"Ответ должен быть коротким - несколько слов. Не используй вопросы с численными ответами.")
+    prompt = (f"Сгенерируй {count} разных вопросов для квиза на тему {topics_map[topic]}. "
+              f"Ответ на каждый вопрос должен быть коротким - несколько слов. "
+              f"Не используй вопросы с численными ответами. "
+              f'Ответь объектом JSON вида {{"questions": ["вопрос 1", "вопрос 2", ...]}}.')
+    if previous_question is not None:
+        prompt += f" Не повторяй вопрос: '{previous_question}'."
 
     try:
-        text = await get_chatgpt_response(prompt)
-        logger.debug(f"Получен вопрос: '{text}'")
-        return text
+        if previous_question is None:
+            # Промпт первого пакета темы неизменен: пакет берется из пула
+            text = await _quiz_pool.get(prompt)
+        else:
+            # Одновременные запросы вопросов по одной теме выполняются одним вызовом API
+            text = await _single_flight(
+                ("quiz", topic, previous_question),
+                lambda: get_chatgpt_response(prompt, response_format={"type": "json_object"})
+            )
+        logger.debug("Получены вопросы: '%s'", text)
     except Exception as e:
-        logger.error(f"Ошибка получения вопроса для темы '{topic}': {str(e)}")
+        logger.error("Ошибка получения вопросов для темы '%s': %s", topic, e)
         raise
 
-async def check_answer(question: str, user_answer: str) -> str:
+    try:
+        questions = json.loads(text).get("questions")
+    except (ValueError, AttributeError):
+        logger.warning("Ответ с вопросами не является объектом JSON: '%s'", text)
+        questions = [text]
+    if not isinstance(questions, list):
+        questions = []
+    questions = [q.strip() for q in questions if isinstance(q, str)]
+    questions = [q for q in questions if q and q != previous_question]
+    if not questions:
+        raise ValueError(f"Не получено ни одного вопроса для темы '{topic}'")
+    return questions
+
+async def check_answer(question: str, user_answer: str) -> Tuple[bool, str]:
     """
     Проверяет правильность ответа на вопрос.
 
+    Модель отвечает в формате JSON {"correct": bool, "feedback": str}, поэтому
+    результат проверки не зависит от текста пояснения.
+
     Args:
         question: Текст вопроса
         user_answer: Ответ пользователя
 
     Returns:
-        Результат проверки (например, "Правильно!" или "Неправильно. Правильный ответ - ...")
+        Кортеж (ответ правильный, текст результата для пользователя,
+        например "Правильно!" или "Неправильно! Правильный ответ - ...")
     """
-    logger.debug(f"Проверка ответа '{user_answer}' на вопрос '{question}'")
+    logger.debug("Проверка ответа '%s' на вопрос '%s'", user_answer, question)
     prompt = f"""Вопрос: {question}
     Ответ пользователя: {user_answer}
 
-    Если ответ правильный или очень похож на правильный, ответь "Правильно!".
-    Если ответ неправильный - ответь в формате: "Неправильно! 
-    Правильный ответ - {{answer}}", где {{answer}} - правильный ответ.
+    Ответь объектом JSON вида {{"correct": true/false, "feedback": "..."}}.
+    Если ответ правильный или очень похож на правильный, correct = true, feedback = "Правильно!".
+    Если ответ неправильный, correct = false, feedback в формате:
+    "Неправильно! Правильный ответ - {{answer}}", где {{answer}} - правильный ответ.
     """
     try:
-        text = await get_chatgpt_response(prompt)
-        logger.debug(f"Результат проверки: '{text}'")
-        return text
+        text = await get_chatgpt_response(prompt, response_format={"type": "json_object"})
+        logger.debug("Результат проверки: '%s'", text)
     except Exception as e:
-        logger.error(f"Ошибка проверки ответа для вопроса '{question}': {str(e)}")
-        raise
\ No newline at end of file
+        logger.error("Ошибка проверки ответа для вопроса '%s': %s", question, e)
+        raise
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        logger.warning("Ответ проверки не является объектом JSON: '%s'", text)
+        return text.lstrip().startswith("Правильно"), text
+
+    # JSON-режим гарантирует корректный JSON, но не тип значения: "true", 1, "yes"
+    correct = data.get("correct")
+    correct = correct is True or str(correct).strip().lower() in ("true", "1", "yes")
+    return correct, str(data.get("feedback") or "")
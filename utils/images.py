@@ -1,26 +1,199 @@
-from aiogram.types import Message, FSInputFile
+import json
+import logging
+from pathlib import Path
 
+import aiofiles
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, BufferedInputFile, InlineKeyboardMarkup, InputMediaPhoto
 
-async def send_image(message: Message, image_path: str) -> None:
+from config import Config
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Максимальная длина подписи к изображению в Telegram
+CAPTION_LIMIT = 1024
+
+
+def truncate_caption(text: str) -> str:
+    """Обрезает текст до допустимой длины подписи к изображению."""
+    if len(text) > CAPTION_LIMIT:
+        return text[:CAPTION_LIMIT - 4] + "..."
+    return text
+
+
+async def answer_cached_photo(message: Message, image_path: str, **kwargs) -> Message:
     """
-    Отправляет изображение пользователю в Telegram чат.
+    Отправляет изображение в ответ на сообщение, переиспользуя ранее загруженный файл.
+
+    После первой отправки Telegram возвращает file_id, который сохраняется в
+    Config.IMAGE_FILE_IDS: повторные отправки не загружают файл заново.
+    До получения file_id содержимое файла берется из Config.IMAGE_BYTES,
+    чтобы не читать его с диска при каждом запросе.
 
     Args:
-        message (Message): Объект сообщения от aiogram, содержащий информацию о чате.
-        image_path (str): Путь к файлу изображения на сервере.
+        message: Сообщение, в чат которого отправляется изображение
+        image_path: Путь к файлу изображения
+        **kwargs: Дополнительные параметры answer_photo (caption, reply_markup и т.д.)
 
     Returns:
-        None: Функция ничего не возвращает, но отправляет изображение в чат или сообщение об ошибке.
+        Message: Отправленное сообщение
 
     Raises:
-        Exception: Ловит любые исключения при отправке изображения и отправляет сообщение об ошибке пользователю.
+        FileNotFoundError: Если файл изображения не найден
     """
-    try:
-        # Создаем объект FSInputFile из указанного пути
-        photo = FSInputFile(image_path)
+    file_id = Config.IMAGE_FILE_IDS.get(image_path)
+    if file_id is not None:
+        try:
+            return await message.answer_photo(photo=file_id, **kwargs)
+        except TelegramBadRequest as e:
+            logger.warning("Сохраненный file_id для %s не принят, повторная загрузка: %s", image_path, e)
+            Config.IMAGE_FILE_IDS.pop(image_path, None)
+
+    data = Config.IMAGE_BYTES.get(image_path)
+    if data is None:
+        # Например, после Config.reload: файл читается без блокировки цикла событий
+        async with aiofiles.open(image_path, "rb") as f:
+            data = await f.read()
+        Config.IMAGE_BYTES[image_path] = data
+
+    sent = await message.answer_photo(
+        photo=BufferedInputFile(data, filename=Path(image_path).name),
+        **kwargs
+    )
+    if sent.photo:
+        Config.IMAGE_FILE_IDS[image_path] = sent.photo[-1].file_id
+        logger.debug("Сохранен file_id для %s", image_path)
+    return sent
+
 
-        # Отправляем изображение в чат
-        await message.answer_photo(photo)
+async def answer_photo_or_text(
+        message: Message,
+        image_key: str,
+        text: str,
+        reply_markup=None,
+        error_text: str = "Произошла ошибка. Попробуйте снова."
+) -> None:
+    """
+    Отправляет изображение из Config.IMAGE_PATHS с подписью, а при ошибке - текст.
+
+    Подпись обрезается до CAPTION_LIMIT символов. Если изображение не настроено
+    или файл не найден, отправляется текст; при других ошибках - error_text.
+    Клавиатура отправляется в любом случае.
+
+    Args:
+        message: Сообщение, в чат которого выполняется отправка
+        image_key: Ключ изображения в Config.IMAGE_PATHS
+        text: Подпись к изображению
+        reply_markup: Клавиатура (опционально)
+        error_text: Текст сообщения при ошибке отправки
+    """
+    if len(text) > CAPTION_LIMIT:
+        logger.warning("Подпись для изображения '%s' обрезана до %s символов", image_key, CAPTION_LIMIT, stacklevel=2)
+        text = truncate_caption(text)
+
+    image_path = Config.IMAGE_PATHS.get(image_key)
+    if image_path is None:
+        logger.warning("Изображение '%s' не найдено в Config.IMAGE_PATHS", image_key, stacklevel=2)
+        await message.answer(text, reply_markup=reply_markup)
+        return
+
+    try:
+        await answer_cached_photo(message, image_path, caption=text, reply_markup=reply_markup)
+        logger.debug("Отправлено изображение %s в chat_id=%s", image_path, message.chat.id, stacklevel=2)
+    except FileNotFoundError:
+        logger.error("Файл изображения %s не найден", image_path, stacklevel=2)
+        await message.answer(text, reply_markup=reply_markup)
     except Exception as e:
-        # В случае ошибки отправляем сообщение с описанием проблемы
-        await message.answer(f"Не удалось отправить изображение: {e}")
\ No newline at end of file
+        logger.error("Ошибка отправки изображения: %s", e, stacklevel=2)
+        await message.answer(error_text, reply_markup=reply_markup)
+
+
+async def edit_photo_or_answer(
+        message: Message,
+        image_key: str,
+        text: str,
+        reply_markup=None,
+        error_text: str = "Произошла ошибка. Попробуйте снова."
+) -> None:
+    """
+    Заменяет изображение и подпись сообщения бота, а если это невозможно - отправляет новое.
+
+    Редактирование выполняется, только если сообщение содержит изображение, для
+    нового изображения уже известен file_id, а клавиатура inline (editMessageMedia
+    не принимает reply-клавиатуры): запрос не загружает файл и не создает новое
+    сообщение. Иначе (или при ошибке редактирования) выполняется answer_photo_or_text.
+
+    Args:
+        message: Сообщение бота с изображением, которое редактируется
+        image_key: Ключ изображения в Config.IMAGE_PATHS
+        text: Подпись к изображению
+        reply_markup: Клавиатура (опционально)
+        error_text: Текст сообщения при ошибке отправки
+    """
+    file_id = Config.IMAGE_FILE_IDS.get(Config.IMAGE_PATHS.get(image_key))
+    editable_markup = reply_markup is None or isinstance(reply_markup, InlineKeyboardMarkup)
+    if message.photo and file_id is not None and editable_markup:
+        try:
+            await message.edit_media(
+                InputMediaPhoto(media=file_id, caption=truncate_caption(text)),
+                reply_markup=reply_markup
+            )
+            logger.debug("Отредактировано изображение '%s' в chat_id=%s", image_key, message.chat.id, stacklevel=2)
+            return
+        except TelegramBadRequest as e:
+            logger.debug("Не удалось отредактировать изображение, отправляется новое: %s", e, stacklevel=2)
+    await answer_photo_or_text(message, image_key, text, reply_markup=reply_markup, error_text=error_text)
+
+
+def load_image_file_ids() -> None:
+    """
+    Загружает сохраненный кэш file_id изображений из Config.IMAGE_FILE_IDS_FILE.
+
+    Отсутствующий или поврежденный файл не является ошибкой: кэш заполнится
+    заново при первых отправках.
+    """
+    try:
+        with open(Config.IMAGE_FILE_IDS_FILE, "r", encoding="utf-8") as f:
+            file_ids = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning("Не удалось загрузить кэш file_id изображений: %s", e)
+        return
+    if isinstance(file_ids, dict):
+        Config.IMAGE_FILE_IDS.update(file_ids)
+        logger.debug("Загружено %s file_id изображений", len(file_ids))
+
+
+def save_image_file_ids() -> None:
+    """
+    Сохраняет кэш file_id изображений в Config.IMAGE_FILE_IDS_FILE.
+    """
+    try:
+        with open(Config.IMAGE_FILE_IDS_FILE, "w", encoding="utf-8") as f:
+            json.dump(Config.IMAGE_FILE_IDS, f, ensure_ascii=False, indent=2)
+        logger.debug("Сохранено %s file_id изображений", len(Config.IMAGE_FILE_IDS))
+    except OSError as e:
+        logger.warning("Не удалось сохранить кэш file_id изображений: %s", e)
+
+
+async def preload_images() -> None:
+    """
+    Читает в Config.IMAGE_BYTES файлы изображений, для которых еще нет file_id.
+
+    Вызывается при запуске бота после load_image_file_ids: первая отправка
+    каждого изображения не читает файл с диска в обработчике.
+    Отсутствующие файлы пропускаются (их обработает answer_cached_photo).
+    """
+    paths = {
+        path for path in Config.IMAGE_PATHS.values()
+        if path not in Config.IMAGE_FILE_IDS and path not in Config.IMAGE_BYTES
+    }
+    for path in paths:
+        try:
+            async with aiofiles.open(path, "rb") as f:
+                Config.IMAGE_BYTES[path] = await f.read()
+        except OSError as e:
+            logger.warning("Не удалось прочитать изображение %s: %s", path, e)
+    logger.debug("Предзагружено %s изображений", len(paths))
@@ -0,0 +1,61 @@
+"""
+Модуль фильтра сообщений по ключевым словам главного меню.
+
+Основные функции:
+- Поиск всех ключевых слов в тексте сообщения за один проход скомпилированного выражения
+- Кэширование результата по тексту: роутеры, проверяющие одно сообщение, не сканируют его повторно
+- Фильтр aiogram для регистрации обработчиков по ключевому слову
+"""
+import re
+from functools import lru_cache
+from typing import FrozenSet
+
+from aiogram.filters import Filter
+from aiogram.types import Message
+
+# Ключевые слова режимов, которые ищутся в тексте сообщения без учета регистра
+MENU_KEYWORDS = ("random", "talk", "quiz", "translate", "voice")
+
+_KEYWORDS_PATTERN = re.compile("|".join(map(re.escape, MENU_KEYWORDS)), re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def classify(text: str) -> FrozenSet[str]:
+    """
+    Возвращает ключевые слова, содержащиеся в тексте.
+
+    Args:
+        text: Текст сообщения
+
+    Returns:
+        Множество найденных ключевых слов (в нижнем регистре)
+    """
+    return frozenset(match.group().lower() for match in _KEYWORDS_PATTERN.finditer(text))
+
+
+class KeywordFilter(Filter):
+    """
+    Фильтр, пропускающий текстовые сообщения, которые содержат ключевое слово.
+
+    Эквивалентен F.text.lower().contains(keyword), но текст классифицируется один раз
+    для всех фильтров.
+
+    Атрибуты:
+        keyword: Ключевое слово из MENU_KEYWORDS
+    """
+    def __init__(self, keyword: str):
+        """
+        Инициализирует KeywordFilter.
+
+        Args:
+            keyword: Ключевое слово из MENU_KEYWORDS
+
+        Raises:
+            ValueError: Если ключевое слово не входит в MENU_KEYWORDS
+        """
+        if keyword not in MENU_KEYWORDS:
+            raise ValueError(f"Ключевое слово '{keyword}' не входит в MENU_KEYWORDS")
+        self.keyword = keyword
+
+    async def __call__(self, message: Message) -> bool:
+        return bool(message.text) and self.keyword in classify(message.text)
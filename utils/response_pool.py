@@ -0,0 +1,110 @@
+"""
+Модуль пула заранее полученных ответов ChatGPT.
+
+Основные функции:
+- Хранение нескольких свежих ответов на неизменный промпт (случайный факт, первый вопрос темы квиза)
+- Выдача ответа из пула без ожидания API; каждый ответ выдается один раз
+- Фоновое пополнение пула после каждой выдачи
+- Удаление ответов, пролежавших в пуле дольше времени жизни
+"""
+import asyncio
+import logging
+from collections import deque
+from time import monotonic
+from typing import Awaitable, Callable, Deque, Dict, Tuple
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+class ResponsePool:
+    """
+    Пул заранее полученных ответов для промптов, ответ на которые должен быть каждый раз новым.
+
+    В отличие от кэша, ответ не выдается повторно: пул лишь получает следующий ответ
+    заранее, поэтому пользователь не ждет API, а количество запросов к API не растет.
+
+    Атрибуты:
+        fetch: Функция получения ответа по промпту
+        size: Количество ответов, поддерживаемое в пуле для каждого промпта
+        ttl: Время хранения ответа в пуле (секунды)
+    """
+    def __init__(self, fetch: Callable[[str], Awaitable[str]], size: int = 3, ttl: float = 3600):
+        """
+        Инициализирует ResponsePool.
+
+        Args:
+            fetch: Функция получения ответа по промпту
+            size: Количество ответов, поддерживаемое в пуле для каждого промпта (0 - пул отключен)
+            ttl: Время хранения ответа в пуле (секунды)
+        """
+        self.fetch = fetch
+        self.size = size
+        self.ttl = ttl
+        self._pools: Dict[str, Deque[Tuple[float, str]]] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+
+    async def get(self, prompt: str) -> str:
+        """
+        Возвращает ответ на промпт из пула или от API и запускает пополнение пула.
+
+        Args:
+            prompt: Текст запроса
+
+        Returns:
+            Ответ, еще не выдававшийся ранее
+
+        Raises:
+            Exception: Если пул пуст и произошла ошибка API
+        """
+        if self.size <= 0:
+            return await self.fetch(prompt)
+
+        pool = self._pools.setdefault(prompt, deque())
+        now = monotonic()
+        while pool and pool[0][0] < now:
+            pool.popleft()
+
+        if pool:
+            _, response = pool.popleft()
+            logger.debug("Ответ выдан из пула, осталось %s", len(pool))
+        else:
+            response = await self.fetch(prompt)
+        self._refill(prompt)
+        return response
+
+    def _refill(self, prompt: str) -> None:
+        """
+        Запускает фоновое пополнение пула промпта, если оно еще не выполняется.
+
+        Args:
+            prompt: Текст запроса
+        """
+        task = self._refills.get(prompt)
+        if task is not None and not task.done():
+            return
+        self._refills[prompt] = asyncio.create_task(self._fill(prompt))
+
+    async def _fill(self, prompt: str) -> None:
+        """
+        Получает ответы, пока пул промпта не заполнится.
+
+        Ошибки API не прерывают работу бота: пул пополнится при следующей выдаче.
+
+        Args:
+            prompt: Текст запроса
+        """
+        pool = self._pools.setdefault(prompt, deque())
+        while len(pool) < self.size:
+            try:
+                response = await self.fetch(prompt)
+            except Exception as e:
+                logger.warning("Не удалось пополнить пул ответов: %s", e)
+                return
+            pool.append((monotonic() + self.ttl, response))
+
+    def cancel(self) -> None:
+        """Отменяет выполняющиеся пополнения пула (при остановке бота)."""
+        for task in self._refills.values():
+            task.cancel()
+        self._refills.clear()
@@ -0,0 +1,80 @@
+"""
+Модуль семантического кэша ответов ChatGPT.
+
+Основные функции:
+- Хранение пар (эмбеддинг запроса, ответ) в памяти
+- Поиск ближайшего сохраненного запроса по косинусному сходству
+- Ограничение количества записей (старые записи вытесняются)
+"""
+import math
+import operator
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    """Приводит вектор к единичной длине."""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        return list(vector)
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """
+    Кэш ответов, в котором поиск выполняется по близости эмбеддингов запросов.
+
+    Векторы хранятся нормализованными, поэтому косинусное сходство вычисляется
+    как скалярное произведение. Поиск линейный: кэш рассчитан на тысячи записей,
+    поэтому search можно вызывать в отдельном потоке (asyncio.to_thread), пока
+    цикл событий добавляет записи.
+
+    Атрибуты:
+        maxsize: Максимальное количество записей
+        threshold: Минимальное косинусное сходство для попадания в кэш
+    """
+    def __init__(self, maxsize: int = 2000, threshold: float = 0.9):
+        """
+        Инициализирует SemanticCache.
+
+        Args:
+            maxsize: Максимальное количество записей
+            threshold: Минимальное косинусное сходство для попадания в кэш
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._entries: Deque[Tuple[List[float], str]] = deque(maxlen=maxsize)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def search(self, embedding: Sequence[float]) -> Optional[str]:
+        """
+        Ищет ответ на запрос, близкий к заданному.
+
+        Args:
+            embedding: Эмбеддинг запроса
+
+        Returns:
+            Сохраненный ответ с наибольшим сходством не ниже threshold или None
+        """
+        query = _normalize(embedding)
+        best_score = self.threshold
+        best_response = None
+        # Поиск идет по снимку записей: add может выполняться одновременно из цикла событий
+        for vector, response in list(self._entries):
+            score = sum(map(operator.mul, query, vector))
+            if score >= best_score:
+                best_score = score
+                best_response = response
+        return best_response
+
+    def add(self, embedding: Sequence[float], response: str) -> None:
+        """
+        Сохраняет ответ для запроса с заданным эмбеддингом.
+
+        Args:
+            embedding: Эмбеддинг запроса
+            response: Ответ ChatGPT
+        """
+        self._entries.append((_normalize(embedding), response))
@@ -0,0 +1,89 @@
+"""
+Модуль с ограниченным хранилищем пользовательских сессий.
+
+Основные функции:
+- Хранение данных сессий в памяти с ограничением по количеству записей
+- Вытеснение давно неиспользуемых записей (LRU)
+- Удаление записей по истечении времени жизни (TTL)
+"""
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from time import monotonic
+from typing import Any, Iterator, Tuple
+
+
+class SessionStore(MutableMapping):
+    """
+    Словарь сессий с ограничением размера и временем жизни записей.
+
+    Каждое обращение к записи переносит ее в конец очереди вытеснения и, если
+    sliding=True, продлевает ее время жизни. При sliding=False запись истекает
+    через ttl после записи, сколько бы раз ее ни читали. При превышении maxsize
+    удаляются давно неиспользуемые записи.
+    Блокировки не нужны: aiogram обрабатывает апдейты в одном потоке цикла событий,
+    а все операции хранилища синхронные.
+
+    Атрибуты:
+        maxsize: Максимальное количество записей
+        ttl: Время жизни записи (секунды): без обращений или с момента записи
+        sliding: Продлевать ли время жизни при чтении
+    """
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600, sliding: bool = True):
+        """
+        Инициализирует SessionStore.
+
+        Args:
+            maxsize: Максимальное количество записей
+            ttl: Время жизни записи (секунды): без обращений или с момента записи
+            sliding: Продлевать ли время жизни при чтении
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sliding = sliding
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def __getitem__(self, key: Any) -> Any:
+        expires_at, value = self._data[key]
+        now = monotonic()
+        if expires_at < now:
+            del self._data[key]
+            raise KeyError(key)
+        if self.sliding:
+            self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __delitem__(self, key: Any) -> None:
+        del self._data[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        self.cleanup()
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        self.cleanup()
+        return len(self._data)
+
+    def cleanup(self) -> None:
+        """
+        Удаляет записи с истекшим временем жизни.
+        """
+        now = monotonic()
+        if not self.sliding:
+            # Порядок обращений не совпадает с порядком истечения: проверяются все записи
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at < now]
+            for key in expired:
+                del self._data[key]
+            return
+        # Записи упорядочены по времени последнего обращения, поэтому истекшие находятся в начале
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at >= now:
+                break
+            del self._data[key]
@@ -0,0 +1,153 @@
+"""
+Модуль ограничения частоты исходящих запросов к Telegram Bot API.
+
+Основные функции:
+- Token bucket для равномерного распределения запросов во времени
+- Middleware сессии бота, ограничивающий отправку и редактирование сообщений
+  (общий лимит бота и лимит на каждый чат, более строгий для групп)
+- Общая пауза и повтор запроса при ответе 429 (TelegramRetryAfter)
+- Подтверждения callback-запросов и служебные методы проходят без очереди
+"""
+import asyncio
+import logging
+from time import monotonic
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from utils.session_store import SessionStore
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Префиксы методов Bot API, на которые распространяется лимит сообщений
+LIMITED_METHOD_PREFIXES = ("send", "edit", "copy", "forward")
+
+# Служебные методы с этими префиксами, которые не создают сообщений и проходят без очереди
+UNLIMITED_METHODS = frozenset(("sendChatAction",))
+
+# Количество повторов запроса после ответа 429
+RETRY_AFTER_ATTEMPTS = 3
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket.
+
+    Атрибуты:
+        rate: Количество токенов, пополняемых в секунду
+        capacity: Максимальное количество накопленных токенов
+    """
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Инициализирует TokenBucket.
+
+        Args:
+            rate: Количество токенов, пополняемых в секунду
+            capacity: Максимальное количество накопленных токенов (по умолчанию равно rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = monotonic()
+        # Ожидающие получают токены в порядке очереди
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Ожидает и забирает один токен.
+        """
+        async with self._lock:
+            while True:
+                now = monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class OutgoingRateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота, ограничивающий частоту отправки сообщений.
+
+    Telegram допускает около 30 сообщений в секунду на бота, около одного сообщения
+    в секунду в личном чате (с короткими всплесками) и не более 20 сообщений в минуту
+    в группе; при всплеске нагрузки запросы
+    ждут своей очереди здесь, а не получают ошибку 429 с долгой паузой.
+    Если ошибка 429 все же получена, все ограничиваемые запросы приостанавливаются
+    на retry_after секунд, после чего запрос повторяется.
+    Методы вне LIMITED_METHOD_PREFIXES (answerCallbackQuery, getUpdates, getFile)
+    и UNLIMITED_METHODS (sendChatAction) выполняются сразу: подтверждения нажатий
+    не задерживаются, а индикаторы действий не расходуют лимит чата.
+    """
+    def __init__(self, rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 group_rate: float = 20 / 60):
+        """
+        Инициализирует OutgoingRateLimitMiddleware.
+
+        Args:
+            rate: Максимальное количество сообщений в секунду для всего бота
+            chat_rate: Максимальное количество сообщений в секунду в одном личном чате
+            chat_burst: Количество сообщений, которое можно отправить в чат подряд без ожидания
+            group_rate: Максимальное количество сообщений в секунду в одной группе
+        """
+        self.bucket = TokenBucket(rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        # Лимиты чатов: {chat_id: TokenBucket}; неактивные чаты вытесняются
+        self._chat_buckets = SessionStore(maxsize=10_000, ttl=60)
+        self._paused_until = 0.0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        """
+        Возвращает token bucket чата, создавая его при первом обращении.
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            TokenBucket чата
+        """
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # У групп и каналов отрицательный ID или @username вместо ID
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(self.group_rate if is_group else self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _wait_pause(self) -> None:
+        """Ожидает окончания общей паузы после ответа 429."""
+        delay = self._paused_until - monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        if api_method in UNLIMITED_METHODS or not api_method.startswith(LIMITED_METHOD_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            await self._chat_bucket(chat_id).acquire()
+        for attempt in range(RETRY_AFTER_ATTEMPTS + 1):
+            await self._wait_pause()
+            await self.bucket.acquire()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == RETRY_AFTER_ATTEMPTS:
+                    raise
+                logger.warning("Telegram ограничил частоту запросов, пауза %s с (%s)", e.retry_after, method.__api_method__)
+                self._paused_until = max(self._paused_until, monotonic() + e.retry_after)
@@ -1,8 +1,9 @@
 import asyncio
 import os
+import aiofiles
 import httpx
 import openai
-from config import Config
+from utils.chatgpt import get_gpt_client
 
 
 async def voice_to_text(voice_file, message):
@@ -14,7 +15,10 @@ async def voice_to_text(voice_file, message):
         message: Объект сообщения из Telegram бота
 
     Возвращает:
-        str: Распознанный текст или сообщение об ошибке
+        str: Распознанный текст
+
+    Исключения:
+        RuntimeError: Если происходит ошибка при распознавании (исходная ошибка в __cause__)
 
     Процесс работы:
         1. Скачивание голосового сообщения
@@ -31,7 +35,7 @@ async def voice_to_text(voice_file, message):
         await message.bot.download_file(voice_file.file_path, voice_path)
 
         if not os.path.exists(voice_path):
-            return "Ошибка: не удалось сохранить голосовое сообщение"
+            raise RuntimeError("Не удалось сохранить голосовое сообщение")
 
         # Конвертируем в MP3 через ffmpeg
         mp3_path = os.path.splitext(voice_path)[0] + ".mp3"
@@ -61,14 +65,11 @@ async def voice_to_text(voice_file, message):
             raise RuntimeError("Конвертированный файл не создан")
 
         # Читаем конвертированный файл
-        with open(mp3_path, "rb") as f:
-            audio_data = f.read()
+        async with aiofiles.open(mp3_path, "rb") as f:
+            audio_data = await f.read()
 
         # Отправляем в OpenAI
-        gpt_client = openai.AsyncOpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            http_client=httpx.AsyncClient(proxy=Config.PROXY),
-        )
+        gpt_client = get_gpt_client()
 
         translation = await gpt_client.audio.translations.create(
             model="whisper-1",
@@ -78,14 +79,16 @@ async def voice_to_text(voice_file, message):
 
         return translation
 
-    except httpx.HTTPError:
-        return "Ошибка подключения к сервису распознавания речи"
-    except openai.APIError:
-        return "Ошибка API распознавания речи"
-    except openai.AuthenticationError:
-        return "Ошибка аутентификации в сервисе распознавания речи"
+    except httpx.HTTPError as e:
+        raise RuntimeError(f"Ошибка подключения к сервису распознавания речи: {str(e)}") from e
+    except openai.AuthenticationError as e:
+        raise RuntimeError(f"Ошибка аутентификации в сервисе распознавания речи: {str(e)}") from e
+    except openai.APIError as e:
+        raise RuntimeError(f"Ошибка API распознавания речи: {str(e)}") from e
+    except RuntimeError:
+        raise
     except Exception as e:
-        return f"Произошла ошибка: {str(e)}"
+        raise RuntimeError(f"Ошибка при распознавании речи: {str(e)}") from e
     finally:
         # Удаляем временные файлы
         for file_path in [voice_path, mp3_path]:
@@ -113,10 +116,7 @@ async def text_to_voice(text: str) -> bytes:
         Использует модель GPT-4o-mini-tts с веселым и позитивным тоном голоса
     """
     try:
-        gpt_client = openai.AsyncOpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            http_client=httpx.AsyncClient(proxy=Config.PROXY),
-        )
+        gpt_client = get_gpt_client()
 
         async with gpt_client.audio.speech.with_streaming_response.create(
                 model="gpt-4o-mini-tts",  # Возможно, следует использовать "tts-1" или "tts-1-hd"
@@ -127,4 +127,4 @@ async def text_to_voice(text: str) -> bytes:
             return await response.read()
 
     except Exception as e:
-        raise RuntimeError(f"Ошибка при преобразовании текста в речь: {str(e)}")
\ No newline at end of file
+        raise RuntimeError(f"Ошибка при преобразовании текста в речь: {str(e)}") from e
\ No newline at end of file